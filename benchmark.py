@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:40:12 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+import sys
+if "./src" not in sys.path:
+    sys.path.append("./src")
+
+# py imports
+import timeit
+import io
+import json
+
+# project imports
+import vec
+import poly
+import visu
+import rot4
+import bfh
+import headless
+import boundary
+
+# =============================================================================
+# Micro benchmarks
+#   small timing utilities to compare the hot paths between commits, run
+#   python benchmark.py [name ...] from the main folder
+#
+#   python benchmark.py --save file.json [name ...] stores the results
+#   python benchmark.py --compare file.json [name ...] fails (exit code 1) if
+#   a result is more than max_regression slower than the stored one
+# =============================================================================
+
+# results of the benchmarks run, "title/name" -> [value, unit]
+collected = {}
+
+# units where a higher value is better
+higher_is_better = ["ticks/s"]
+
+# allowed slow down when comparing to stored results
+max_regression = 0.25
+
+def time_op(stmt, env, number = 200000, repeat = 5):
+    ''' returns the best time per operation in nanoseconds '''
+    timer = timeit.Timer(stmt, globals=env)
+    best = min(timer.repeat(repeat, number))
+    return best / number * 1e9
+
+def report(title, results):
+    print(f"--- {title} ---")
+    for name, value, unit in results:
+        print(f"{name:<24} {value:10.1f} {unit}")
+        collected[title + "/" + name] = [value, unit]
+
+def compare(baseline):
+    ''' returns the list of results that regressed in respect to a baseline '''
+    regressions = []
+    for key, (value, unit) in collected.items():
+        if key not in baseline:
+            continue
+        
+        base = baseline[key][0]
+        if unit in higher_is_better:
+            ratio = base / value if value else float("inf")
+        else:
+            ratio = value / base if base else 1.
+        
+        if ratio > 1 + max_regression:
+            regressions.append(f"{key}: {base:.1f} -> {value:.1f} {unit}")
+    return regressions
+
+def bench_vec():
+    ''' per operation cost of the 4d vectors '''
+    env = {"vec" : vec,
+           "a" : vec.V4(1., 2., 3., 4.),
+           "b" : vec.V4(.5, .5, .5, .5)}
+    
+    ops = [("V4(x, y, z, w)", "vec.V4(1., 2., 3., 4.)"),
+           ("V4(list)", "vec.V4([1., 2., 3., 4.])"),
+           ("a + b", "a + b"),
+           ("a - b", "a - b"),
+           ("a * k", "a * 2.0"),
+           ("a.dot(b)", "a.dot(b)"),
+           ("a.is_close(b)", "a.is_close(b)"),
+           ("a == b", "a == b"),
+           ("a.x()", "a.x()")]
+    
+    results = []
+    for name, stmt in ops:
+        results.append((name, time_op(stmt, env), "ns/op"))
+    
+    report("vec", results)
+
+def scene_plist(length):
+    ''' bbox, food and a snake of the given length, as in the game p_list '''
+    p_list = [poly.create_cube4d(vec.V4(0, 0, 0, 0), 6, "black"),
+              poly.create_cube4d(vec.V4(1, 1, 1, 1), 0.9, "blue")]
+    for i in range(length):
+        center = vec.V4(i % 6 - 3, (i // 6) % 6 - 3, i // 36 - 3, 0)
+        p_list.append(poly.create_cube4d(center, 1., "green"))
+    return p_list
+
+def bench_project():
+    ''' perspective projection cost of a whole frame against snake length '''
+    proj = visu.ProjectCam()
+    
+    def per_vertex(p_list):
+        for p in p_list:
+            for v in p.v_list:
+                proj.cam3.prj(proj.cam4.prj(v))
+    
+    results = []
+    for length in [4, 16, 64, 128]:
+        env = {"p_list" : scene_plist(length), "proj" : proj,
+               "per_vertex" : per_vertex}
+        t = time_op("per_vertex(p_list)", env, 20, 3) / 1e6
+        results.append((f"per vertex {length}", t, "ms/frame"))
+        t = time_op("proj.project_plist(p_list)", env, 20, 3) / 1e6
+        results.append((f"batch {length}", t, "ms/frame"))
+    
+    report("project", results)
+
+def bench_flat():
+    ''' flat views cost of a whole frame against snake length '''
+    results = []
+    for axes in ["yx", "wz"]:
+        proj = visu.ProjectFlat(axes)
+        for length in [4, 16, 64, 128]:
+            env = {"p_list" : scene_plist(length), "proj" : proj}
+            t = time_op("proj.project_plist(p_list)", env, 20, 3) / 1e6
+            results.append((f"{axes} {length}", t, "ms/frame"))
+    
+    report("flat", results)
+
+def bench_boundary():
+    ''' snake surface against the full hypercubes, canvas items and the
+    perspective frame cost '''
+    proj = visu.ProjectCam()
+    
+    results = []
+    for length in [4, 16, 64, 128]:
+        p_list = scene_plist(length)
+        pid_list = list(range(len(p_list)))
+        
+        b = boundary.SnakeBoundary()
+        b.rebuild(p_list, pid_list)
+        s = b.stats()
+        results.append((f"cube edges {length}", s["cube_edges"], "edges"))
+        results.append((f"segments {length}", s["segments"], "edges"))
+        
+        env = {"proj" : proj, "p_list" : p_list[:2] + [b.polygon()]}
+        t = time_op("proj.project_plist(p_list)", env, 20, 3) / 1e6
+        results.append((f"project {length}", t, "ms/frame"))
+    
+    report("boundary", results)
+
+def bench_rot4():
+    ''' rotation of a hypercube worth of vertexes '''
+    v_list = poly.create_cube4d(vec.V4(1, 2, 3, 4), 1., "green").v_list
+    env = {"rot4" : rot4, "v_list" : v_list}
+    angles = "0.1, 0.2, 0.3, 0.4, 0.5, 0.6"
+    
+    results = []
+    stmt = f"[rot4.rot_v(v, {angles}) for v in v_list]"
+    results.append(("rot_v x16", time_op(stmt, env, 2000) / 1e3, "us"))
+    stmt = f"rot4.rot_many(v_list, {angles})"
+    results.append(("rot_many 16", time_op(stmt, env, 2000) / 1e3, "us"))
+    
+    report("rot4", results)
+
+def bench_bfh():
+    ''' serialisation of a game frame, to a file object and to a bytearray '''
+    
+    def write_frame(fobj, p_list):
+        bf = bfh.BinaryFile(fobj)
+        bf.write("I", len(p_list))
+        for p in p_list:
+            p.as_bytes(bf)
+    
+    def read_frame(fobj):
+        bf = bfh.BinaryFile(fobj)
+        p_list = [poly.Polygon() for i in range(bf.read("I"))]
+        for p in p_list:
+            p.interpret_bytes(bf)
+    
+    results = []
+    for length in [4, 64]:
+        p_list = scene_plist(length)
+        data = io.BytesIO()
+        write_frame(data, p_list)
+        
+        env = {"write_frame" : write_frame, "read_frame" : read_frame,
+               "p_list" : p_list, "io" : io, "data" : data.getvalue()}
+        
+        t = time_op("write_frame(io.BytesIO(), p_list)", env, 20, 3) / 1e6
+        results.append((f"write file {length}", t, "ms/frame"))
+        t = time_op("write_frame(bytearray(), p_list)", env, 20, 3) / 1e6
+        results.append((f"write buffer {length}", t, "ms/frame"))
+        t = time_op("read_frame(io.BytesIO(data))", env, 20, 3) / 1e6
+        results.append((f"read file {length}", t, "ms/frame"))
+        t = time_op("read_frame(data)", env, 20, 3) / 1e6
+        results.append((f"read buffer {length}", t, "ms/frame"))
+    
+    report("bfh", results)
+
+def bench_engine():
+    ''' headless games with a seeded greedy player, also writing the replay '''
+    results = []
+    
+    for serialise in [False, True]:
+        sim = headless.Simulator(seed=0, max_ticks=1000, serialise=serialise)
+        d = sim.run(3).as_dict()
+        
+        label = "serialise" if serialise else "routine"
+        results.append((f"{label} ticks/s", d["ticks_per_s"], "ticks/s"))
+        results.append((f"{label} p50 tick", d["p50_tick_us"], "us"))
+        results.append((f"{label} p95 tick", d["p95_tick_us"], "us"))
+    
+    report("engine", results)
+
+# maps the benchmark name to the function
+benchmarks = {}
+benchmarks["vec"] = bench_vec
+benchmarks["project"] = bench_project
+benchmarks["flat"] = bench_flat
+benchmarks["boundary"] = bench_boundary
+benchmarks["rot4"] = bench_rot4
+benchmarks["bfh"] = bench_bfh
+benchmarks["engine"] = bench_engine
+
+def main(args):
+    save_file = None
+    compare_file = None
+    
+    names = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--save":
+            save_file = args.pop(0)
+        elif arg == "--compare":
+            compare_file = args.pop(0)
+        else:
+            names.append(arg)
+    
+    if not names:
+        names = list(benchmarks.keys())
+    
+    for name in names:
+        benchmarks[name]()
+    
+    if save_file:
+        with open(save_file, "w") as f:
+            json.dump(collected, f, indent=1)
+    
+    if compare_file:
+        with open(compare_file, "r") as f:
+            regressions = compare(json.load(f))
+        
+        for r in regressions:
+            print("REGRESSION", r)
+        
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -9,29 +9,19 @@ Created on Thu Jun 28 01:14:38 2018
 # Imports
 # =============================================================================
 
-# make the folder src as a local import path
-import sys
-if "../src" not in sys.path:
-    sys.path.append("../src")
-    
-# python imports
-import math
-
 # blender imports
 import bpy
 
-# custom imports
-import load_replay
-import prj
-import rot4
+# numpy is shipped with blender
+import numpy
 
 # =============================================================================
 # Script constants
 # =============================================================================
 
-# load the replay
-replay = load_replay.LoadReplay()
-replay.load_replay_file("./20_cubes_score.sk4")
+# load the projected replay, made outside of blender with
+# python precompute_scene_4d.py ./20_cubes_score.sk4 ./20_cubes_score.npz
+cache = numpy.load("./20_cubes_score.npz")
 
 # map the materials to the colors of the snake
 color_to_mat = {}
@@ -39,9 +29,24 @@ color_to_mat["black"] = "BBoxMat"
 color_to_mat["blue"] = "FoodMat"
 color_to_mat["green"] = "SnakeMat"
 
+# the arrays are read from the file at every access of the cache, they are
+# read once here. The vertexes of the objects are already rotated and 
+# projected in 3d
+vertices = cache["vertices"]
+object_vertices = cache["object_vertices"]
+object_topology = cache["object_topology"]
+object_color = cache["object_color"]
+
+# edges and faces of each topology, converted once
+def topology_lists(data, ranges):
+    return [data[start : start + n].tolist() for start, n in ranges]
 
-# 4d camera
-cam4 = prj.Cam4()
+topology_edges = topology_lists(cache["topology_edges"], 
+                                cache["topology_edge_range"])
+topology_faces = topology_lists(cache["topology_faces"], 
+                                cache["topology_face_range"])
+
+colors = cache["colors"].tolist()
 
 # =============================================================================
 # Functions
@@ -64,29 +69,28 @@ def clear_hcubes(prefix):
             
     print(f"deleted {prefix}_ objects")
 
-# creates an objet starting from a 4d set of points, and eventual rotations
-def create_blender_object(name, poly4, rot):
+# creates an objet starting from the cached object, the vertexes are 
+# already projected
+def create_blender_object(name, obj):
     # name it
     name = "hcube_" + name
     
     # create mesh
     meshName = name + "_mesh"
     
-    # project the stuff
-    v_list3 = []
-    for v in poly4.v_list:
-        vrot = rot4.rot_v(v, *rot)
-        v3 = cam4.prj(vrot)
-        v_list3.append(v3.coords)
+    start, n = object_vertices[obj]
+    v_list3 = vertices[start : start + n].tolist()
+    
+    topo = object_topology[obj]
         
     me = bpy.data.meshes.new(meshName)
-    me.from_pydata(v_list3, poly4.e_list, poly4.f_list)
+    me.from_pydata(v_list3, topology_edges[topo], topology_faces[topo])
     
     # create the object and mesh
     ob = bpy.data.objects.new(name, me)
 
     # add the material
-    mat_name = color_to_mat[poly4.color]
+    mat_name = color_to_mat[colors[object_color[obj]]]
    
     mat = bpy.data.materials[mat_name]
     ob.data.materials.append(mat) 
@@ -120,36 +124,17 @@ def visibility(ob, start, end):
 # clear the scene in  case there are hyper cubes around
 clear_hcubes("hcube")
 
-# rotation
-angle = 0
-
-# constants
-# the game frames to be read
-game_frames = len(replay.frames)
-
-# animation frames per game frame
-ani_game_frames = 2
-
-for game_frame in range(game_frames):
-
-    for frame in range(ani_game_frames):
+# the objects are sorted by animation frame
+object_frame = cache["object_frame"]
+object_index = cache["object_index"]
 
-        p_list = replay.get_frame()
-
-
-        ani_frame = game_frame * ani_game_frames + frame
-        
-        for i, p in enumerate(p_list): 
-            rot = [angle, 0, 0, 0, 0, 0]
-            
-            ob = create_blender_object(f"{ani_frame}_{i}", p, rot)
-            visibility(ob, ani_frame, ani_frame)
-        
-        
-        angle += math.radians(1.44)
-        
-        print(f"\rCreated game frame: {game_frame}, blender frame: {ani_frame}", end="")
-    replay.next_frame()
+for obj in range(len(object_frame)):
+    ani_frame = int(object_frame[obj])
+    
+    ob = create_blender_object(f"{ani_frame}_{object_index[obj]}", obj)
+    visibility(ob, ani_frame, ani_frame)
+    
+    print(f"\rCreated blender frame: {ani_frame}", end="")
 
 print()
 
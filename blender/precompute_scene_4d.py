@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:05:47 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+# make the folder src as a local import path
+import sys
+if "../src" not in sys.path:
+    sys.path.append("../src")
+
+# python imports
+import os
+import math
+import time
+import array
+import struct
+import zipfile
+import concurrent.futures
+
+# custom imports
+import load_replay
+import prj
+import rot4
+
+# =============================================================================
+# Scene precompute
+#   projects the replay frames for create_scene_4d.py outside of blender, run
+#   from the blender folder:
+#
+#   python precompute_scene_4d.py replay.sk4 cache.npz [options]
+#
+#   every animation frame rotates the 4d polygons of its game frame by the
+#   angle schedule of the scene and projects them in 3d with the 4d camera.
+#   The vertexes of a frame are rotated and projected in one batch (one
+#   rotation matrix, one prj_many call) and the game frames are split in
+#   chunks between worker processes.
+#
+#   The result is a .npz file (a zip of .npy arrays) written without numpy,
+#   blender loads it with numpy.load:
+#
+#   vertices             float64 (V, 3) projected vertexes of all the objects
+#   object_frame         int32 (O,) animation frame of the object
+#   object_index         int32 (O,) position of the polygon in the frame
+#   object_vertices      int32 (O, 2) first vertex and number of vertexes
+#   object_topology      int32 (O,) topology of the object
+#   object_color         int32 (O,) index in colors
+#   colors               unicode (C,) color names
+#   topology_edges       int32 (E, 2) edges of all the topologies
+#   topology_edge_range  int32 (T, 2) first edge and number of edges
+#   topology_faces       int32 (F, 4) faces of all the topologies
+#   topology_face_range  int32 (T, 2) first face and number of faces
+#   info                 int32 (3,) game frames, animation frames per game
+#                        frame, animation frames
+# =============================================================================
+
+usage = '''usage: python precompute_scene_4d.py replay.sk4 cache.npz [options]
+    --ani-frames N     animation frames per game frame (2)
+    --angle DEG        rotation per animation frame in degrees (1.44)
+    --workers N        number of processes (all the cores)
+    --chunk N          game frames per chunk (frames / 4 workers)'''
+
+# animation frames per game frame
+ani_game_frames = 2
+
+# rotation of the alpha angle per animation frame
+angle_step = 1.44
+
+# =============================================================================
+# npy / npz writer
+# =============================================================================
+
+def npy_header(descr, shape):
+    ''' version 1.0 header, the data starts aligned to 64 bytes '''
+    if len(shape) == 1:
+        str_shape = f"({shape[0]},)"
+    else:
+        str_shape = "(" + ", ".join(str(n) for n in shape) + ")"
+
+    header = (f"{{'descr': '{descr}', 'fortran_order': False, "
+              f"'shape': {str_shape}, }}")
+
+    # magic, version and header length take 10 bytes
+    pad = 64 - (10 + len(header) + 1) % 64
+    header = header + " " * (pad % 64) + "\n"
+
+    return (b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) +
+            header.encode("latin1"))
+
+def npy_numbers(typecode, values, shape):
+    ''' typecode is "d" (float64) or "i" (int32) '''
+    a = array.array(typecode, values)
+    if sys.byteorder == "big":
+        a.byteswap()
+
+    descr = "<f8" if typecode == "d" else "<i4"
+    return npy_header(descr, shape) + a.tobytes()
+
+def npy_strings(values):
+    ''' fixed size unicode array, utf-32 as numpy stores it '''
+    size = max([len(s) for s in values] + [1])
+    data = b"".join(s.ljust(size, "\0").encode("utf-32-le") for s in values)
+    return npy_header(f"<U{size}", (len(values),)) + data
+
+def write_npz(filename, arrays):
+    ''' arrays is a list of (name, npy data) '''
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in arrays:
+            z.writestr(name + ".npy", data)
+
+# =============================================================================
+# Projection
+# =============================================================================
+
+def topology_key(p):
+    return (tuple(tuple(e) for e in p.e_list),
+            tuple(tuple(f) for f in p.f_list))
+
+def project_chunk(filename, start, end, ani_frames, angle):
+    ''' projects the game frames start..end-1, runs in the worker processes.
+    The topologies are numbered in the chunk, the caller merges them '''
+    replay = load_replay.open_replay(filename, verbose=False)
+    cam4 = prj.Cam4()
+
+    vertices = array.array("d")
+    objects = []
+    topologies = {}
+
+    for game_frame in range(start, end):
+        p_list = replay.frames[game_frame]
+
+        # the polygon vertexes stacked once for the game frame
+        coords4 = []
+        p_info = []
+        for i, p in enumerate(p_list):
+            c = p.coords()
+            coords4.extend(c)
+
+            key = topology_key(p)
+            topo = topologies.get(key)
+            if topo is None:
+                topo = len(topologies)
+                topologies[key] = topo
+
+            p_info.append((i, len(c) // 4, topo, p.color))
+
+        for frame in range(ani_frames):
+            ani_frame = game_frame * ani_frames + frame
+
+            m = rot4.rotation_matrix(ani_frame * angle, 0, 0, 0, 0, 0)
+            coords3 = cam4.prj_many(rot4.apply_coords(m, coords4))
+
+            v_start = len(vertices) // 3
+            vertices.extend(coords3)
+
+            for i, n, topo, color in p_info:
+                objects.append((ani_frame, i, v_start, n, topo, color))
+                v_start += n
+
+    replay.close()
+
+    return {"start" : start,
+            "vertices" : vertices.tobytes(),
+            "objects" : objects,
+            "topologies" : list(topologies.keys())}
+
+def precompute(filename, cache_filename, ani_frames = ani_game_frames,
+               angle_deg = angle_step, workers = None, chunk = None):
+    ''' projects the whole replay and writes the cache '''
+    t0 = time.perf_counter()
+
+    replay = load_replay.open_replay(filename, verbose=False)
+    game_frames = len(replay.frames)
+    replay.close()
+
+    workers = workers or os.cpu_count() or 1
+    if not chunk:
+        chunk = max(1, -(-game_frames // (workers * 4)))
+
+    angle = math.radians(angle_deg)
+    bounds = [(s, min(s + chunk, game_frames))
+              for s in range(0, game_frames, chunk)]
+
+    if workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(project_chunk, filename, s, e,
+                                   ani_frames, angle) for s, e in bounds]
+            chunks = [f.result() for f in futures]
+    else:
+        chunks = [project_chunk(filename, s, e, ani_frames, angle)
+                  for s, e in bounds]
+
+    t_project = time.perf_counter() - t0
+
+    # merge the chunks, the vertexes and topologies are renumbered
+    vertices = array.array("d")
+    colors = {}
+    topologies = {}
+
+    o_frame = []
+    o_index = []
+    o_vertices = []
+    o_topology = []
+    o_color = []
+
+    for c in chunks:
+        v_offset = len(vertices) // 3
+        vertices.frombytes(c["vertices"])
+
+        topo_map = []
+        for key in c["topologies"]:
+            if key not in topologies:
+                topologies[key] = len(topologies)
+            topo_map.append(topologies[key])
+
+        for ani_frame, i, v_start, n, topo, color in c["objects"]:
+            if color not in colors:
+                colors[color] = len(colors)
+
+            o_frame.append(ani_frame)
+            o_index.append(i)
+            o_vertices.extend((v_start + v_offset, n))
+            o_topology.append(topo_map[topo])
+            o_color.append(colors[color])
+
+    edges = []
+    edge_range = []
+    faces = []
+    face_range = []
+    for e_list, f_list in topologies:
+        edge_range.extend((len(edges) // 2, len(e_list)))
+        for e in e_list:
+            edges.extend(e)
+
+        face_range.extend((len(faces) // 4, len(f_list)))
+        for f in f_list:
+            faces.extend(f[:4])
+
+    n_obj = len(o_frame)
+    n_topo = len(topologies)
+
+    write_npz(cache_filename,
+        [("vertices", npy_numbers("d", vertices, (len(vertices) // 3, 3))),
+         ("object_frame", npy_numbers("i", o_frame, (n_obj,))),
+         ("object_index", npy_numbers("i", o_index, (n_obj,))),
+         ("object_vertices", npy_numbers("i", o_vertices, (n_obj, 2))),
+         ("object_topology", npy_numbers("i", o_topology, (n_obj,))),
+         ("object_color", npy_numbers("i", o_color, (n_obj,))),
+         ("colors", npy_strings(list(colors))),
+         ("topology_edges", npy_numbers("i", edges, (len(edges) // 2, 2))),
+         ("topology_edge_range", npy_numbers("i", edge_range, (n_topo, 2))),
+         ("topology_faces", npy_numbers("i", faces, (len(faces) // 4, 4))),
+         ("topology_face_range", npy_numbers("i", face_range, (n_topo, 2))),
+         ("info", npy_numbers("i", [game_frames, ani_frames,
+                                    game_frames * ani_frames], (3,)))])
+
+    t_total = time.perf_counter() - t0
+
+    print(f"Game frames: {game_frames} animation frames: "
+          f"{game_frames * ani_frames} objects: {n_obj} "
+          f"vertexes: {len(vertices) // 3}")
+    print(f"Workers: {workers} chunks: {len(bounds)} projection: "
+          f"{t_project:.2f} s total: {t_total:.2f} s")
+    print("Cache size:",
+          load_replay.str_file_size(os.path.getsize(cache_filename)))
+
+def main(args):
+    ani_frames = ani_game_frames
+    angle_deg = angle_step
+    workers = None
+    chunk = None
+
+    files = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--ani-frames":
+            ani_frames = int(args.pop(0))
+        elif arg == "--angle":
+            angle_deg = float(args.pop(0))
+        elif arg == "--workers":
+            workers = int(args.pop(0))
+        elif arg == "--chunk":
+            chunk = int(args.pop(0))
+        else:
+            files.append(arg)
+
+    if len(files) != 2:
+        print(usage)
+        sys.exit(2)
+
+    precompute(files[0], files[1], ani_frames, angle_deg, workers, chunk)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
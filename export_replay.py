@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:32:05 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+import sys
+if "./src" not in sys.path:
+    sys.path.append("./src")
+
+# py imports
+import math
+import os
+import json
+import time
+import concurrent.futures
+
+# project imports
+import vec
+import visu
+import load_replay
+import boundary
+import g_eng
+import instrument
+import rot4
+import qua
+import mat
+
+# =============================================================================
+# Replay exporter
+#   renders the frames of a replay without a display and writes them as
+#   numbered images, run from the main folder:
+#
+#   python export_replay.py replay.sk4 [options]
+#
+#   the frames are split in contiguous chunks which are rendered by a pool of
+#   processes, every chunk opens the replay on its own so that only the
+#   chunk bounds travel between the processes. The camera of a frame depends
+#   only on the frame number: frame i is seen from the initial position
+#   rotated i times by the rotation per frame. The rotation matrix of the
+#   frame is the power i of the per frame matrix (the plane rotations don't
+#   commute, scaling the angles by i would be a different path), so any 
+#   process can render any frame and the result doesn't depend on the 
+#   number of workers
+# =============================================================================
+
+usage = '''usage: python export_replay.py replay.sk4 [options]
+    --out DIR          output folder (./export)
+    --size WxH         image size in pixels (400x400)
+    --format png|ppm   image format (png)
+    --view VIEW        persp or two axes as yx, wz (persp)
+    --start N          first frame (0)
+    --end N            frame after the last one (all the frames)
+    --workers N        number of processes (all the cores)
+    --chunk N          frames per chunk (frames / 4 workers)
+    --cam4 x,y,z,w     initial 4d camera position (15,0.1,0.1,0.1)
+    --cam3 x,y,z       initial 3d camera position (2.5,2.5,2.5)
+    --rot4 a,b,c,d,e,f 4d camera rotation per frame, degrees (0,0,0,0,0,0)
+    --rot3 x,y,z       3d camera rotation per frame, degrees (0,0,0)'''
+
+class ExportSettings:
+    ''' the options of an export, sent to the workers '''
+
+    def __init__(self):
+        self.replay = None
+        self.out = "./export"
+        self.size = (400, 400)
+        self.fmt = "png"
+        self.view = "persp"
+        self.start = 0
+        self.end = None
+        self.workers = os.cpu_count() or 1
+        self.chunk = None
+        self.cam4 = [15, 0.1, 0.1, 0.1]
+        self.cam3 = [2.5, 2.5, 2.5]
+        self.rot4 = [0, 0, 0, 0, 0, 0]
+        self.rot3 = [0, 0, 0]
+
+    def frame_filename(self, i):
+        return os.path.join(self.out, f"frame_{i:05d}.{self.fmt}")
+
+def parse_floats(s, n):
+    values = [float(c) for c in s.split(",")]
+    if len(values) != n:
+        raise ValueError(f"expected {n} comma separated values: {s}")
+    return values
+
+def parse_args(args):
+    settings = ExportSettings()
+
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--out":
+            settings.out = args.pop(0)
+        elif arg == "--size":
+            w, h = args.pop(0).lower().split("x")
+            settings.size = (int(w), int(h))
+        elif arg == "--format":
+            settings.fmt = args.pop(0).lower()
+        elif arg == "--view":
+            settings.view = args.pop(0).lower()
+        elif arg == "--start":
+            settings.start = int(args.pop(0))
+        elif arg == "--end":
+            settings.end = int(args.pop(0))
+        elif arg == "--workers":
+            settings.workers = int(args.pop(0))
+        elif arg == "--chunk":
+            settings.chunk = int(args.pop(0))
+        elif arg == "--cam4":
+            settings.cam4 = parse_floats(args.pop(0), 4)
+        elif arg == "--cam3":
+            settings.cam3 = parse_floats(args.pop(0), 3)
+        elif arg == "--rot4":
+            settings.rot4 = parse_floats(args.pop(0), 6)
+        elif arg == "--rot3":
+            settings.rot3 = parse_floats(args.pop(0), 3)
+        elif arg.startswith("--"):
+            raise ValueError("unknown option " + arg)
+        else:
+            settings.replay = arg
+
+    if settings.replay is None:
+        raise ValueError("missing replay file")
+
+    if settings.fmt not in ("png", "ppm"):
+        raise ValueError("unknown format " + settings.fmt)
+
+    if settings.view != "persp" and (len(settings.view) != 2 or
+                                     any(c not in "xyzw" for c in settings.view)):
+        raise ValueError("unknown view " + settings.view)
+
+    return settings
+
+# =============================================================================
+# Frame rendering
+# =============================================================================
+
+def matrix_power(m, n):
+    ''' m to the power n by repeated squaring, m is a mat.SquareMatrix '''
+    res = mat.SquareMatrix(m.m).get_identity()
+    while n:
+        if n & 1:
+            res = res * m
+        m = m * m
+        n >>= 1
+    return res
+
+def rotation3_matrix(angles):
+    ''' the matrix of ProjectCam.rotate3: rotations around x, y and z in
+    this order, angles in degrees '''
+    columns = []
+    for k in range(3):
+        e = [0., 0., 0.]
+        e[k] = 1.
+        v = vec.V3(e)
+        for i in range(3):
+            if angles[i] != 0:
+                axis = [0, 0, 0]
+                axis[i] = 1
+                v = qua.rot_around_axis(v, vec.V3(axis), math.radians(angles[i]))
+        columns.append(v.coords)
+    return mat.SquareMatrix([[columns[c][r] for c in range(3)] 
+                             for r in range(3)])
+
+class FrameRenderer:
+    ''' renders the frames of a replay with the camera schedule '''
+
+    def __init__(self, settings):
+        self.settings = settings
+
+        if settings.view == "persp":
+            self.project = visu.ProjectCam()
+            self.boundary = boundary.SnakeBoundary()
+        else:
+            self.project = visu.ProjectFlat(settings.view)
+            self.boundary = None
+
+        self.area = visu.HeadlessArea(self.project, settings.size)
+
+        if self.boundary is not None:
+            # orientation of the 4d orbit after one frame
+            self.reset_cam4()
+            self.project.rotate4(settings.rot4)
+            self.rot4_step = mat.SquareMatrix(self.project.orbit4.rows)
+
+            self.rot3_step = rotation3_matrix(settings.rot3)
+
+    def reset_cam4(self):
+        cam4 = self.project.cam4
+        cam4.To = vec.V4(0, 0, 0, 0)
+        cam4.change_position(vec.V4(self.settings.cam4))
+        self.project.orbit4 = rot4.Orbit4(cam4)
+        return self.project.orbit4
+
+    def set_camera(self, i):
+        ''' places the cameras for the frame i, the per frame rotations are
+        composed i times from the initial position so that every frame is
+        independent '''
+        s = self.settings
+
+        orbit4 = self.reset_cam4()
+        if any(s.rot4):
+            m = matrix_power(self.rot4_step, i)
+            orbit4.rows = [[m[r, c] for c in range(4)] for r in range(4)]
+            orbit4.orthonormalise()
+            orbit4.update_camera()
+
+        from3 = vec.V3(s.cam3)
+        if any(s.rot3):
+            m = matrix_power(self.rot3_step, i)
+            from3 = vec.V3([sum(m[r, c] * s.cam3[c] for c in range(3))
+                            for r in range(3)])
+        self.project.cam3.change_position(from3)
+
+    def scene(self, p_list):
+        ''' in the perspective view the snake is drawn by its boundary '''
+        if self.boundary is None:
+            return p_list
+
+        self.boundary.rebuild(p_list, list(range(len(p_list))))
+        n = g_eng.snake_idx
+        return p_list[:n] + [self.boundary.polygon()]
+
+    def render(self, i, p_list):
+        if self.boundary is not None:
+            self.set_camera(i)
+        return self.area.render(self.scene(p_list))
+
+def render_chunk(settings, start, end):
+    ''' renders the frames start..end-1, returns the chunk timings, runs in
+    the worker processes '''
+    t0 = time.perf_counter()
+
+    replay = load_replay.open_replay(settings.replay, verbose=False)
+    renderer = FrameRenderer(settings)
+
+    decode = []
+    render = []
+    write = []
+
+    for i in range(start, end):
+        t = time.perf_counter()
+        p_list = replay.frames[i]
+
+        t1 = time.perf_counter()
+        raster = renderer.render(i, p_list)
+
+        t2 = time.perf_counter()
+        raster.save(settings.frame_filename(i))
+
+        t3 = time.perf_counter()
+        decode.append(t1 - t)
+        render.append(t2 - t1)
+        write.append(t3 - t2)
+
+    replay.close()
+
+    return {"start" : start,
+            "end" : end,
+            "pid" : os.getpid(),
+            "time" : time.perf_counter() - t0,
+            "decode" : decode,
+            "render" : render,
+            "write" : write}
+
+# =============================================================================
+# Export
+# =============================================================================
+
+def split_frames(start, end, chunk):
+    return [(s, min(s + chunk, end)) for s in range(start, end, chunk)]
+
+def stage_stats(chunks, stage):
+    samples = [t for c in chunks for t in c[stage]]
+    h = instrument.Histogram(stage, len(samples))
+    for t in samples:
+        h.add(t)
+    return h.stats()
+
+def export(settings):
+    ''' renders the frames of the replay, returns the timing report '''
+    replay = load_replay.open_replay(settings.replay, verbose=False)
+    n_frames = len(replay.frames)
+    replay.close()
+
+    start = max(settings.start, 0)
+    end = n_frames if settings.end is None else min(settings.end, n_frames)
+
+    if end <= start:
+        raise ValueError(f"no frames to export, the replay has {n_frames}")
+
+    # more chunks than workers, the frames get heavier as the snake grows
+    # and the smaller chunks balance the load
+    chunk = settings.chunk
+    if not chunk:
+        chunk = max(1, -(-(end - start) // (settings.workers * 4)))
+
+    os.makedirs(settings.out, exist_ok=True)
+
+    t0 = time.perf_counter()
+
+    if settings.workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(settings.workers) as pool:
+            futures = [pool.submit(render_chunk, settings, s, e)
+                       for s, e in split_frames(start, end, chunk)]
+            chunks = [f.result() for f in futures]
+    else:
+        chunks = [render_chunk(settings, s, e)
+                  for s, e in split_frames(start, end, chunk)]
+
+    total = time.perf_counter() - t0
+
+    frames = end - start
+    busy = sum(c["time"] for c in chunks)
+
+    return {"replay" : settings.replay,
+            "frames" : frames,
+            "first" : start,
+            "size" : list(settings.size),
+            "format" : settings.fmt,
+            "view" : settings.view,
+            "workers" : settings.workers,
+            "chunk" : chunk,
+            "total_s" : total,
+            "fps" : frames / total,
+            "busy_s" : busy,
+            "efficiency" : busy / (total * settings.workers),
+            "decode" : stage_stats(chunks, "decode"),
+            "render" : stage_stats(chunks, "render"),
+            "write" : stage_stats(chunks, "write"),
+            "chunks" : [{"start" : c["start"], "end" : c["end"],
+                         "pid" : c["pid"], "time_s" : c["time"]}
+                        for c in chunks]}
+
+def print_report(report):
+    print(f"Exported {report['frames']} frames of {report['replay']} in "
+          f"{report['total_s']:.2f} s, {report['fps']:.1f} frames/s")
+    print(f"Workers: {report['workers']} chunk: {report['chunk']} frames "
+          f"efficiency: {report['efficiency'] * 100:.0f}%")
+
+    for stage in ("decode", "render", "write"):
+        s = report[stage]
+        print(f"{stage:<8} mean: {s['mean_ms']:8.2f} ms "
+              f"p50: {s['p50_ms']:8.2f} ms p95: {s['p95_ms']:8.2f} ms")
+
+def main(args):
+    try:
+        settings = parse_args(args)
+    except (ValueError, IndexError) as e:
+        print(e)
+        print(usage)
+        sys.exit(2)
+
+    report = export(settings)
+
+    with open(os.path.join(settings.out, "timings.json"), "w") as f:
+        json.dump(report, f, indent=1)
+
+    print_report(report)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
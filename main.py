@@ -16,6 +16,7 @@ if "./src" not in sys.path:
 # py imports
 import datetime
 import shutil
+import os
 
 # GUI stuff
 from tkinter import (Tk, _tkinter, StringVar, Label, Menu, Toplevel, 
@@ -27,7 +28,9 @@ import g_eng
 import score
 import replay
 import keybuf
-import rate
+import scheduler
+import instrument
+import boundary
 
 
 #==============================================================================
@@ -36,6 +39,20 @@ import rate
 
 # Think about a better way to do the replay
 
+#==============================================================================
+# Level of detail
+#==============================================================================
+
+# snake length after which the far segments are simplified
+LOD_MIN_LENGTH = 32
+
+# maximum edges drawn in each flat area per frame
+LOD_EDGE_BUDGET = 600
+
+# drawing backend of the areas: "canvas" keeps a canvas item for each edge,
+# "raster" draws the frame in a pixel buffer shown as one image
+BACKEND = "canvas"
+
 #==============================================================================
 # Help message
 #==============================================================================
@@ -65,6 +82,9 @@ To control the CAMERA use:             \n
   Y, X, C to control 3d rotations       \n
   V, B, N, M, T or Z to control 4d     \n
   rotations                            \n
+                                       \n
+F2 shows the timings, F3 saves them    \n
+in the profiler_data folder            \n
 **********************************************\n'''
 
 #==============================================================================
@@ -88,6 +108,7 @@ class MainApp:
         toggle_pause -- pauses unpauses the game
         move -- triggers the change of direction given by the key pressed
         draw -- draws the scene
+        game_step -- advances the game of one tick
         updater -- the cycle ticker of the game
 
     Instance variables:
@@ -101,6 +122,9 @@ class MainApp:
         self.paused -- the game state paused or not
         self.score_board -- the score display utilites
         self.replay -- manages the replay
+        self.scheduler -- runs the periodic tasks
+        self.overlay -- shows the instrumentation timings
+        self.boundary -- the snake surface drawn in the perspective view
     '''
 
     def __init__(self, root):
@@ -126,24 +150,35 @@ class MainApp:
         # wasd or ijkl the direction match the keyboard
 
         self.areas = []
+        
+        # the level of detail policy for long snakes, one for each flat 
+        # area. The perspective area draws the snake as one boundary polygon
+        # with only the surface edges, the length threshold of the policy
+        # can't act on it
+        def lod():
+            return visu.LevelOfDetail(min_length=LOD_MIN_LENGTH,
+                                      edge_budget=LOD_EDGE_BUDGET)
 
         # area 0 - perspective
         proj = visu.ProjectCam()
-        area4 = visu.VisuArea(root, proj, [500, 500])
+        area4 = visu.VisuArea(root, proj, [500, 500], retained=True,
+                              backend=BACKEND)
         area4.fP.grid(row=1, column=0, columnspan=2)
         self.areas.append(area4)
 
         # area 1 - 2d projection of the yx axis
         proj = visu.ProjectFlat("yx")
         proj.zoom = 0.5
-        area_xy = visu.VisuArea(root, proj, [250, 250], "YX")
+        area_xy = visu.VisuArea(root, proj, [250, 250], "YX", retained=True,
+                                lod=lod(), backend=BACKEND)
         area_xy.fP.grid(row=2, column=0)
         self.areas.append(area_xy)
 
         # area 2 - 2d projection of the wz axis
         proj = visu.ProjectFlat("wz")
         proj.zoom = 0.5
-        area_wz = visu.VisuArea(root, proj, [250, 250], "WZ")
+        area_wz = visu.VisuArea(root, proj, [250, 250], "WZ", retained=True,
+                                lod=lod(), backend=BACKEND)
         area_wz.fP.grid(row=2, column=1)
         self.areas.append(area_wz)
 
@@ -175,13 +210,28 @@ class MainApp:
         # adds a central text to the first area for instructions
         self.areas[0].add_text("Press any key to play")
 
+        # instrumentation, F2 turns the timers and the overlay on and off,
+        # F3 exports the collected timings
+        self.overlay = instrument.Overlay(self.areas[0].canvas)
+        self.root.bind("<F2>", self.toggle_instrument)
+        self.root.bind("<F3>", self.export_instrument)
+
         # the scores, which are saved in score.txt
         self.score_board = score.ScoreBoard(self.root)
         
         # creates the replay settings
         self.replay = replay.Replay(self.game)
         
+        # runs the periodic tasks
+        self.scheduler = scheduler.Scheduler(self.root)
         
+        # the game changes drawn last, the scene is redrawn only if the game
+        # published new changes or the camera moved
+        self.drawn_changes = None
+        self.view_changed = True
+        
+        # edges of the snake surface for the perspective view
+        self.boundary = boundary.SnakeBoundary()
 
     def create_menu(self):
         '''
@@ -237,6 +287,7 @@ class MainApp:
             
             if filename:
                 # copy the temp replay to a new filename
+                self.replay.flush()
                 src = self.replay.tmp_replay_file
                 shutil.copy(src, filename)
         
@@ -288,6 +339,24 @@ class MainApp:
             rotation = self.rot3k_to_angle[event.char]
             
             self.areas[0].project_method.rotate3(rotation)
+        
+        self.view_changed = True
+
+    # switches the timers on and off
+    def toggle_instrument(self, event):
+        instrument.toggle()
+        self.overlay.update()
+
+    # saves the timings as json and csv
+    def export_instrument(self, event):
+        folder = "./profiler_data/instrument/"
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        instrument.export_json(folder + stamp + ".json")
+        instrument.export_csv(folder + stamp + ".csv")
+        print("Timings saved in", folder + stamp)
 
     # shows the help board
     def help_cmd(self):
@@ -321,82 +390,97 @@ class MainApp:
         # get key in the updated function
         self.key_buffer.push_key(pressed_key)
 
-    # draw the scenes
+    # draw the scenes, only if something changed since the last draw
     def draw(self):
-        for area in self.areas:
+        if self.game.changes is self.drawn_changes and not self.view_changed:
+            return
+        
+        # the perspective view draws only the boundary of the snake, the
+        # flat views filter the overlapping edges by themselves
+        p_list, pid_list = self.boundary.scene(self.game)
+        self.areas[0].clear_area()
+        self.areas[0].draw_plist(p_list, pid_list)
+        
+        for area in self.areas[1:]:
             area.clear_area()
-            area.draw_plist(self.game.p_list)
+            area.draw_plist(self.game.p_list, self.game.pid_list)
+        
+        self.drawn_changes = self.game.changes
+        self.view_changed = False
 
-    # the UI cycle
-    def updater(self):
+    # a game tick
+    def game_step(self):
+        if self.paused or self.game.state == g_eng.GameEngine.gamestate_game_over:
+            return
+        
+        # clears annoying text
+        self.areas[0].clear_text()
+
+        # reads the next key, thus the next direction from the
+        # buffer
+        next_dir = self.key_buffer.get_key()
+
+        # if the key is actually a direction and is a valid one
+        # here could actually skip the invalid directions...
+        # like random keys but keep the backward to head direction
+        # which is a mistake the player can make
+        if next_dir:
+            self.game.snake.change_dir(next_dir)
+
+        self.game.routine()
+        
+        # writes the frames if the record option is on
+        self.replay.save_replay_frame(self.game)
+
+        # updates the score label
+        self.score_str.set("Score: " + str(self.game.score))
+
+        # if the games ends in a game over, then show the top score
+        # board
+        if self.game.state == g_eng.GameEngine.gamestate_game_over:
+            self.areas[0].add_text("Game Over\nPress space for new game")
+
+            # create new score
+            curr_score = score.Score(datetime.datetime.now(), self.game.score)
+            self.score_board.add_score(curr_score)
+            self.score_board.render_scores()
 
-        # rates of update
-        draw_rate = rate.Rate(1 / 25.0)
-        game_rate = rate.Rate(1 / 2.0)
-        update_rate = rate.Rate(1 / 50.0)
-        replay_rate = rate.Rate(1 / 2.0)
+            # pause the game
+            self.paused = True
+
+    # refreshes the timings overlay while the instrumentation is on
+    def update_overlay(self):
+        if instrument.enabled:
+            self.overlay.update()
+
+    # the UI cycle, the tasks are called by the tkinter main loop at their
+    # rates, between them the main loop sleeps waiting for events
+    def updater(self):
 
         # reset the replay file overwriting it with a empty byte string
         self.replay.reset_replay_file()
 
+        self.scheduler.add_task("replay", 1 / 2.0, self.replay.play_frames)
+        self.scheduler.add_task("draw", 1 / 25.0, self.draw)
+        self.scheduler.add_task("game", 1 / 2.0, self.game_step)
         
-        while True:
+        # updates the checkbox
+        self.scheduler.add_task("settings", 1 / 50.0, 
+                                self.replay.replay_settings.read_state)
+        
+        self.scheduler.add_task("overlay", 1 / 2.0, self.update_overlay)
+        
+        self.scheduler.start()
+        
+        try:
+            self.root.mainloop()
+        finally:
+            self.scheduler.stop()
+            print(self.scheduler.report())
+            print(self.boundary)
             
-            if replay_rate.is_time():
-                self.replay.play_frames()
-
-            # drawing scenese
-            if draw_rate.is_time():
-                self.draw()
-
-            # game stuff
-            if  game_rate.is_time():
-
-                if self.paused or self.game.state == g_eng.GameEngine.gamestate_game_over:
-                    pass
-                else:
-                    # clears annoying text
-                    self.areas[0].clear_text()
-
-                    # reads the next key, thus the next direction from the
-                    # buffer
-                    next_dir = self.key_buffer.get_key()
-
-                    # if the key is actually a direction and is a valid one
-                    # here could actually skip the invalid directions...
-                    # like random keys but keep the backward to head direction
-                    # which is a mistake the player can make
-                    if next_dir:
-                        self.game.snake.change_dir(next_dir)
-
-                    self.game.routine()
-                    
-                    # writes the frames if the record option is on
-                    self.replay.save_replay_frame(self.game)
-
-                    # updates the score label
-                    self.score_str.set("Score: " + str(self.game.score))
-
-                    # if the games ends in a game over, then show the top score
-                    # board
-                    if self.game.state == g_eng.GameEngine.gamestate_game_over:
-                        self.areas[0].add_text("Game Over\nPress space for new game")
-
-                        # create new score
-                        curr_score = score.Score(datetime.datetime.now(), self.game.score)
-                        self.score_board.add_score(curr_score)
-                        self.score_board.render_scores()
-
-                        # pause the game
-                        self.paused = True
-
-            # update the tkinter cycle
-            if update_rate.is_time():
-                self.root.update_idletasks()
-                self.root.update()
-                
-                # updates the checkbox
-                self.replay.replay_settings.read_state()
+            if instrument.enabled:
+                print(instrument.report())
 
 # main program
 def main():
@@ -423,6 +507,10 @@ def main():
         print(exp.__class__)
         print(exp)
         raise exp
+    
+    # write the last replay frames
+    finally:
+        mapp.replay.close()
 
 
 if __name__ == "__main__":
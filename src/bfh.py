@@ -9,6 +9,7 @@ Created on Wed Jun 27 17:24:58 2018
 # Imports
 #==============================================================================
 import struct
+import mmap
 
 #==============================================================================
 # Helpers
@@ -17,6 +18,22 @@ import struct
 def as_bytes(dtype, data):
     return struct.pack(dtype, data)
 
+# precompiled structs, the formats used are few (a scalar, an array of a
+# given length) so they are compiled once and kept
+structs = {}
+
+def get_struct(fmt):
+    s = structs.get(fmt)
+    if s is None:
+        s = struct.Struct(fmt)
+        structs[fmt] = s
+    return s
+
+def array_struct(dtype, n):
+    ''' struct for n values of the same type, the = is needed to have the
+    standard sizes without alignment padding '''
+    return get_struct("=" + str(n) + dtype)
+
 #==============================================================================
 # Constants
 #==============================================================================
@@ -27,6 +44,9 @@ type_to_size['I'] = 4
 type_to_size['d'] = 8
 type_to_size['c'] = 1
 
+# objects that are read and written in place instead of through a file
+buffer_types = (bytes, bytearray, memoryview, mmap.mmap)
+
 #==============================================================================
 # Binary file class
 #==============================================================================
@@ -36,66 +56,98 @@ class BinaryFile:
     
     def __init__(self, fobj, co = 0):
         '''
-        self.file is a file object, self.co is the cumulative offset where
-        to start the procedure
+        self.file is a file object or a buffer (bytearray, memoryview, mmap),
+        self.co is the cumulative offset where to start the procedure
         '''
         
         self.file = fobj
         self.co = co
+        
+        # buffers are accessed directly with pack_into and unpack_from
+        self.is_buffer = isinstance(fobj, buffer_types)
+        
+        # where the file pointer is after the last operation, as long as it
+        # matches the offset there is no need to seek. None means unknown
+        self.pos = None
+    
+    def write_bytes(self, b):
+        ''' writes raw bytes at the offset and moves the offset '''
+        end = self.co + len(b)
+        
+        if self.is_buffer:
+            self.file[self.co : end] = b
+        else:
+            if self.pos != self.co:
+                self.file.seek(self.co)
+            self.file.write(b)
+            self.pos = end
+        
+        self.co = end
+    
+    def read_bytes(self, n):
+        ''' reads n raw bytes at the offset and moves the offset '''
+        end = self.co + n
+        
+        if self.is_buffer:
+            b = bytes(self.file[self.co : end])
+        else:
+            if self.pos != self.co:
+                self.file.seek(self.co)
+            b = self.file.read(n)
+            self.pos = end
+        
+        self.co = end
+        return b
+    
+    def pack(self, st, values):
+        ''' writes the values with a precompiled struct '''
+        self.write_bytes(st.pack(*values))
+    
+    def unpack(self, st):
+        ''' reads the values of a precompiled struct, returns a tuple '''
+        if self.is_buffer:
+            values = st.unpack_from(self.file, self.co)
+            self.co += st.size
+            return values
+        else:
+            return st.unpack(self.read_bytes(st.size))
     
     def write(self, dtype, data):
         ''' writes a data packet and moves the offset'''
-        self.file.seek(self.co)
-        b = as_bytes(dtype, data)
-        self.file.write(b)
-        self.co += len(b)
+        self.write_bytes(get_struct(dtype).pack(data))
     
     def read(self, dtype):
         ''' 
         reads a data packet and moves the offset, returns the data packet
         in the specified format
         '''
-        self.file.seek(self.co)
-        size_read = type_to_size[dtype]
-        b = self.file.read(size_read)
-        self.co += size_read
-        return struct.unpack(dtype, b)[0]
+        return self.unpack(get_struct(dtype))[0]
+    
+    def write_array(self, dtype, data):
+        ''' writes a sequence of values of the same type in one go '''
+        self.pack(array_struct(dtype, len(data)), data)
+    
+    def read_array(self, dtype, n):
+        ''' reads n values of the same type, returns a list '''
+        return list(self.unpack(array_struct(dtype, n)))
     
     def write_string(self, string):
         ''' 
         Writess a string saving the length first and then the caracters
         encoded with UTF-8
         '''
-        
-        self.file.seek(self.co)
-        
-        strlen = len(string)
+        b = bytes(string, "utf-8")
         
         #write str len
-        self.write("I", strlen)
-        
-        fmt = 'c'*strlen
-
-        data = []
-        for c in string:
-            data.append(bytes(c, "utf-8"))
-        
-        b = struct.pack(fmt, *data)
-        self.file.write(b)
-        self.co += len(b)
+        self.write("I", len(b))
+        self.write_bytes(b)
     
     def read_string(self):
         ''' readst the string from a binary file... in ascii? mmh...
         '''
-        self.file.seek(self.co)
-        
         # read the length
         strlen = self.read("I")
         
-        b = self.file.read(strlen)
+        b = self.read_bytes(strlen)
         s = str(b, "ascii")
-        self.co += strlen
         return s
-    
-    
-        
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:11:36 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+# project imports
+import vec
+import poly
+import g_eng
+
+#==============================================================================
+# Snake boundary
+#   the snake segments are unit hypercubes on the integer grid, drawing all
+#   their 32 edges draws also the edges inside the snake. The boundary keeps
+#   only the edges of the union of the cells: an edge along the axis a is
+#   touched by the 8 cells around it in the other 3 axes, if their occupancy
+#   doesn't change when flipping one of these axes the edge lies inside a
+#   flat piece of the surface (or inside / outside the snake) and is not
+#   drawn. The drawn unit edges on the same line are merged in segments.
+#
+#   Every segment keeps its slot (edge index) in the boundary polygon while
+#   it exists, a removed segment leaves its slot to the last one, so the 
+#   retained canvas items of the unchanged segments are not moved
+#
+#   The coordinates of the edge lines are doubled, so that the half unit
+#   positions of the cube corners are integers
+#==============================================================================
+
+# polygon id of the boundary polygon
+boundary_pid = -1
+
+# the 3 axes perpendicular to each axis
+perp_axes = [[b for b in range(4) if b != a] for a in range(4)]
+
+# the 8 corner offsets in the perpendicular axes
+signs = [(s1, s2, s3) for s1 in (-1, 1) for s2 in (-1, 1) for s3 in (-1, 1)]
+
+def cell_edges(cell):
+    ''' the 32 edges of a cell as (line, position along the line), the line
+    is (axis, doubled perpendicular coordinates) '''
+    edges = []
+    for a in range(4):
+        b1, b2, b3 = perp_axes[a]
+        for s1, s2, s3 in signs:
+            p = [0, 0, 0, 0]
+            p[b1] = 2 * cell[b1] + s1
+            p[b2] = 2 * cell[b2] + s2
+            p[b3] = 2 * cell[b3] + s3
+            edges.append(((a, tuple(p)), cell[a]))
+    return edges
+
+class SnakeBoundary:
+    '''
+    Boundary edges of the snake cells
+
+    updated with the change sets published by the game engine, only the
+    edges of the added and removed cells are evaluated again
+
+    Public methods:
+        update -- follows the game engine changes
+        polygon -- the boundary as a polygon
+        scene -- the perspective polygon list: bbox, food and boundary
+        stats -- how many edges were culled and merged
+    '''
+
+    def __init__(self, color = "green"):
+        self.color = color
+
+        # cell -> number of segments in it
+        self.cells = {}
+
+        # polygon id -> cell, to remove the segments
+        self.pid_cell = {}
+
+        # line -> positions of the drawn unit edges
+        self.lines = {}
+
+        # line -> merged (start, end) runs, for the lines not changed
+        self.runs = {}
+
+        # last engine change set applied
+        self.changes = None
+        
+        # segment (line, start, end) of each edge of the polygon and the
+        # slot of each segment, kept across the rebuilds
+        self.slots = []
+        self.slot_of = {}
+
+        # boundary polygon, None if it has to be built again
+        self.poly = None
+
+    def clear(self):
+        self.cells = {}
+        self.pid_cell = {}
+        self.lines = {}
+        self.runs = {}
+        self.poly = None
+
+    def is_drawn(self, line, pos):
+        a, p = line
+        cells = self.cells
+
+        # occupancy of the 8 cells around the edge
+        occ = []
+        b1, b2, b3 = perp_axes[a]
+        for s1, s2, s3 in signs:
+            c = [0, 0, 0, 0]
+            c[a] = pos
+            c[b1] = (p[b1] + s1) // 2
+            c[b2] = (p[b2] + s2) // 2
+            c[b3] = (p[b3] + s3) // 2
+            occ.append(tuple(c) in cells)
+
+        # flipping the first, second and third axis, as in the signs order
+        for step in (4, 2, 1):
+            if all(occ[i] == occ[i ^ step] for i in range(8)):
+                return False
+        return True
+
+    def update_cell(self, cell):
+        ''' evaluates again the edges touched by the cell '''
+        for line, pos in cell_edges(cell):
+            drawn = self.is_drawn(line, pos)
+            positions = self.lines.get(line)
+
+            if drawn:
+                if positions is None:
+                    positions = set()
+                    self.lines[line] = positions
+                if pos not in positions:
+                    positions.add(pos)
+                    self.runs.pop(line, None)
+
+            elif positions is not None and pos in positions:
+                positions.discard(pos)
+                self.runs.pop(line, None)
+                if not positions:
+                    del self.lines[line]
+
+        self.poly = None
+
+    def add_cell(self, pid, cell):
+        self.pid_cell[pid] = cell
+        n = self.cells.get(cell, 0)
+        self.cells[cell] = n + 1
+        if n == 0:
+            self.update_cell(cell)
+
+    def remove_cell(self, pid):
+        cell = self.pid_cell.pop(pid)
+        n = self.cells[cell] - 1
+        if n == 0:
+            del self.cells[cell]
+            self.update_cell(cell)
+        else:
+            self.cells[cell] = n
+
+    def rebuild(self, p_list, pid_list):
+        self.clear()
+        for pid, p in zip(pid_list[g_eng.snake_idx:], p_list[g_eng.snake_idx:]):
+            self.add_cell(pid, poly.polygon_cell(p))
+
+    def update(self, geng):
+        ''' applies the changes of the game engine, everything is built again
+        if a frame was missed or the list was replaced. The same change set
+        is applied once, also if it is a full one '''
+        changes = geng.changes
+
+        if changes is self.changes:
+            return
+
+        if (changes.full or self.changes is None or 
+            changes.frame != self.changes.frame + 1):
+            self.rebuild(geng.p_list, geng.pid_list)
+        else:
+            for pid in changes.removed:
+                self.remove_cell(pid)
+            for pid, p in changes.added:
+                self.add_cell(pid, poly.polygon_cell(p))
+
+        self.changes = changes
+
+    def merged_runs(self, line):
+        runs = self.runs.get(line)
+        if runs is None:
+            runs = []
+            for pos in sorted(self.lines[line]):
+                if runs and runs[-1][1] == pos - 1:
+                    runs[-1][1] = pos
+                else:
+                    runs.append([pos, pos])
+            self.runs[line] = runs
+        return runs
+
+    def update_slots(self):
+        ''' gives a slot to the new segments and frees the ones of the 
+        removed segments, in a fixed order '''
+        segments = set()
+        for line in self.lines:
+            for start, end in self.merged_runs(line):
+                segments.add((line, start, end))
+
+        slots = self.slots
+        slot_of = self.slot_of
+
+        for seg in sorted(seg for seg in slot_of if seg not in segments):
+            i = slot_of.pop(seg)
+            last = slots.pop()
+            if i < len(slots):
+                slots[i] = last
+                slot_of[last] = i
+
+        for seg in sorted(seg for seg in segments if seg not in slot_of):
+            slot_of[seg] = len(slots)
+            slots.append(seg)
+
+    def polygon(self):
+        ''' the boundary edges as a polygon, each merged segment has its own
+        two vertexes, the edge i is the segment in the slot i '''
+        if self.poly is not None:
+            return self.poly
+
+        self.update_slots()
+
+        p = poly.Polygon()
+        p.color = self.color
+
+        for (a, perp), start, end in self.slots:
+            v1 = [c / 2 for c in perp]
+            v2 = list(v1)
+            v1[a] = start - 0.5
+            v2[a] = end + 0.5
+
+            n = len(p.v_list)
+            p.v_list.append(vec.V4(v1))
+            p.v_list.append(vec.V4(v2))
+            p.e_list.append((n, n + 1))
+
+        self.poly = p
+        return p
+
+    def scene(self, geng):
+        ''' the polygon list for the perspective view with its ids '''
+        self.update(geng)
+        n = g_eng.snake_idx
+        return (geng.p_list[:n] + [self.polygon()],
+                geng.pid_list[:n] + [boundary_pid])
+
+    def stats(self):
+        unit = 32 * sum(self.cells.values())
+        drawn = sum(len(positions) for positions in self.lines.values())
+        segments = len(self.polygon().e_list)
+        return {"cube_edges" : unit,
+                "boundary_edges" : drawn,
+                "segments" : segments,
+                "culled" : unit - drawn,
+                "merged" : drawn - segments}
+
+    def __str__(self):
+        s = self.stats()
+        return (f"Snake edges: {s['cube_edges']} culled: {s['culled']} "
+                f"boundary: {s['boundary_edges']} merged: {s['merged']} "
+                f"drawn segments: {s['segments']}")
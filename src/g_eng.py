@@ -11,12 +11,48 @@ Created on Tue May 22 22:15:01 2018
 
 # py imports
 import random
-import copy
 
 # project imports
 import snake
 import poly
 import vec
+import instrument
+
+#==============================================================================
+# Polygon list layout
+#   the p_list of the game is the bounding box, the food and the snake 
+#   segments from the tail to the head
+#==============================================================================
+
+bbox_idx = 0
+food_idx = 1
+snake_idx = 2
+
+#==============================================================================
+# Change set
+#   what changed in the polygon list during a frame. The polygons are
+#   identified by an id which is stable as long as the polygon is in the list
+#   so that the consumers (renderers, replay, ...) can work only on the
+#   differences. If full is set the whole list has to be considered new.
+#==============================================================================
+
+class ChangeSet:
+    
+    def __init__(self, frame, full = False):
+        self.frame = frame
+        self.full = full
+        
+        # (pid, polygon) of the polygons appended to the list
+        self.added = []
+        
+        # pids of the polygons removed from the list
+        self.removed = []
+        
+        # (pid, polygon) of the polygons replaced keeping the id (the food)
+        self.moved = []
+    
+    def is_empty(self):
+        return not (self.full or self.added or self.removed or self.moved)
 
 #==============================================================================
 # Game Engine class
@@ -38,8 +74,17 @@ class GameEngine:
     gamestate_game_over = 0
     gamestate_run = 1
     
+    # polygon ids, the snake segments get snake_pid + segment serial
+    bbox_pid = 0
+    food_pid = 1
+    snake_pid = 2
+    
     
-    def __init__(self):
+    def __init__(self, rng = None):
+        # random generator used to place the food, can be a seeded 
+        # random.Random to have a repeatable game
+        self.rng = rng if rng is not None else random
+        
         # creates a snake, which is positioned in the center and with 4 
         # segments in the -x direction
         self.snake = snake.Snake()
@@ -49,6 +94,14 @@ class GameEngine:
         self.bbox_size = 3
         self.bbox = poly.create_cube4d(vec.V4(0, 0, 0, 0), self.bbox_size * 2, "black")
         
+        # the food spawns in the cells with the coordinates in
+        # range(-bbox_size + 1, bbox_size - 1), the snake occupancy keeps 
+        # track of the free ones
+        self.snake.occupancy.set_region(-self.bbox_size + 1, self.bbox_size - 1)
+        
+        # cell of the food
+        self.food_cell = None
+        
         # add a food hypercube
         self.food = self.initialize_food()
         
@@ -58,8 +111,15 @@ class GameEngine:
         # score (sum of the cubes)
         self.score = 0
         
-        # the list of polygons to be drawn
+        # the list of polygons to be drawn, with the polygon ids and the
+        # changes of the last frame
+        self.frame = 0
         self.p_list = []
+        self.pid_list = []
+        self.changes = None
+        
+        # false if the list was set from outside (replays)
+        self.own_plist = False
         self.generate_plist()
     
     def generate_plist(self):
@@ -78,69 +138,91 @@ class GameEngine:
         # add the snake cubes
         for cube in self.snake.p_list:
             self.p_list.append(cube)
+        
+        # the ids
+        self.snake.pop_changes()
+        self.pid_list = [self.bbox_pid, self.food_pid]
+        self.pid_list.extend(self.snake_pid + s for s in self.snake.serials)
+        
+        self.changes = ChangeSet(self.frame, full=True)
+        self.own_plist = True
+    
+    def update_plist(self):
+        ''' Updates the polygon list with the changes of the frame, the
+        removed segments are the first ones of the snake '''
+        
+        # the list was replaced (by the replay), build it again
+        if not self.own_plist:
+            self.generate_plist()
+            return
+        
+        changes = ChangeSet(self.frame)
+        
+        if self.p_list[food_idx] is not self.food:
+            self.p_list[food_idx] = self.food
+            changes.moved.append((self.food_pid, self.food))
+        
+        added, removed = self.snake.pop_changes()
+        
+        if removed:
+            n = len(removed)
+            del self.p_list[snake_idx : snake_idx + n]
+            del self.pid_list[snake_idx : snake_idx + n]
+            changes.removed = [self.snake_pid + s for s in removed]
+        
+        for serial, cube in added:
+            pid = self.snake_pid + serial
+            self.p_list.append(cube)
+            self.pid_list.append(pid)
+            changes.added.append((pid, cube))
+        
+        self.changes = changes
+    
+    def set_plist(self, p_list):
+        ''' replaces the polygon list (replays), the ids are the positions '''
+        self.frame += 1
+        self.p_list = p_list
+        self.pid_list = list(range(len(p_list)))
+        self.changes = ChangeSet(self.frame, full=True)
+        self.own_plist = False
     
     def initialize_food(self):
-        ''' Puts the food in the game, checking if is a valid food position '''
-        
-        # Generates random coordinates for the food
-        def generate_rand_point():
-            coords = []
-            for i in range(4):
-                coords.append(random.randrange(-self.bbox_size + 1, self.bbox_size - 1))
-            return vec.V4(coords)
-        
-        invalid_position = True
-        while invalid_position:
-            food_point = generate_rand_point()
-            invalid_position = False
-            
-            # search if the food collides with the snake
-            for p in self.snake.p_list:
-                if self.intersect(food_point, p):
-                    invalid_position = True
-                    break   
+        ''' Puts the food in a random free cell, the food can't be placed
+        if the snake fills the whole food region '''
+        self.food_cell = self.snake.occupancy.random_free(self.rng)
+        food_point = vec.V4(list(self.food_cell))
                 
         return poly.create_cube4d(food_point, 0.9, "blue")
     
-    
-    def intersect(self, point, polygon):
-        ''' This function checks for the intersection head of the snake with
-        other polygons.
-        The polygon class stores the biggest and smallest vertex in the first 2
-        elements, this is dependent on the create cube function tho, 
-        but it could be solved by the max and min functions '''
-        pbbox_low = polygon.v_list[0]
-        pbbox_high = polygon.v_list[1]
-        
-        for i in range(4):
-            if not (point[i] > pbbox_low[i] and point[i] < pbbox_high[i]):
+    def in_bbox(self, cell):
+        ''' The cells inside the bounding box, the cells on the border of 
+        the box are still inside '''
+        for c in cell:
+            if c <= -self.bbox_size - 1 or c >= self.bbox_size + 1:
                 return False
         return True
     
     def check_collision(self):
-        ''' This function checks if the moved snake hits something '''
+        ''' This function checks if the moved snake hits something, the 
+        checks are done on the integer cells '''
         
         # make the snake move in the next cube
         self.snake.move()
         
-        # have to make the bbox bigger by one unit so that the program can 
-        # use the intersect function to detect a out of box collision
-        ext_bbox = copy.deepcopy(self.bbox)
-        ext_bbox.v_list[0] = self.bbox.v_list[0] - vec.V4(1,1,1,1)
-        ext_bbox.v_list[1] = self.bbox.v_list[1] + vec.V4(1,1,1,1)
+        head = self.snake.head_cell()
         
         # if is outside of the bbox
-        if not self.intersect(self.snake.head_pos, ext_bbox):
+        if not self.in_bbox(head):
             return self.collision_outbbox
         
         # if the snake got food
-        if self.intersect(self.snake.head_pos, self.food):
+        if head == self.food_cell:
             return self.collision_food
         
-        # if the snake crosses itself
-        for p in self.snake.p_list[:-1]:
-            if self.intersect(self.snake.head_pos, p):
-                return self.collision_snake
+        # if the snake crosses itself, the head is counted in the occupancy
+        # so another segment is there if the count is more than 1
+        if self.snake.occupancy.count(head) > 1:
+            return self.collision_snake
             
         # else no collisions
         return self.collision_none
@@ -155,17 +237,24 @@ class GameEngine:
             
         elif collision == self.collision_food:
             self.snake.add_segment()
-            self.food = self.initialize_food()
             self.score += 1
+            
+            # the snake filled the food region, there is nothing left to eat
+            if not self.snake.occupancy.free:
+                self.state = self.gamestate_game_over
+            else:
+                self.food = self.initialize_food()
 
+    @instrument.timed("GameEngine.routine")
     def routine(self):
         ''' Stuff happening every frame
         the game routine, checks the collision which will "move" the snake
-        evaluates it and generates the new plist
+        evaluates it and updates the plist
         '''
+        self.frame += 1
         c = self.check_collision()
         self.evaluate_collision(c)
-        self.generate_plist()
+        self.update_plist()
         
     def frame_as_bytes(self, bf):
         ''' Needed to save the replay '''
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:48:15 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+# py imports
+import random
+import time
+import tracemalloc
+
+# project imports
+import g_eng
+import sk4
+import bfh
+
+#==============================================================================
+# Headless game driver
+#   runs the game engine without tkinter, as fast as possible, with a seeded
+#   random generator and a policy that plays instead of the keyboard. Used 
+#   to benchmark the engine, collision and replay serialisation paths
+#==============================================================================
+
+possible_dirs = ["UP", "DOWN", "LEFT", "RIGHT", "FW", "RW", "IN", "OUT"]
+
+#==============================================================================
+# Policies
+#   a policy returns the next direction for a game engine, or None to keep
+#   the current one
+#==============================================================================
+
+class RandomPolicy:
+    ''' turns in a random direction with a given probability '''
+    
+    def __init__(self, rng, turn_prob = 0.3):
+        self.rng = rng
+        self.turn_prob = turn_prob
+    
+    def next_dir(self, geng):
+        if self.rng.random() < self.turn_prob:
+            return self.rng.choice(possible_dirs)
+        return None
+
+class ScriptedPolicy:
+    ''' plays a list of directions, None keeps the direction '''
+    
+    def __init__(self, directions):
+        self.directions = directions
+        self.i = 0
+    
+    def next_dir(self, geng):
+        if self.i < len(self.directions):
+            d = self.directions[self.i]
+            self.i += 1
+            return d
+        return None
+
+class GreedyPolicy:
+    ''' goes toward the food avoiding the walls and itself if possible, with 
+    some random moves, the snake grows long enough to test the slow paths '''
+    
+    def __init__(self, rng, noise = 0.1):
+        self.rng = rng
+        self.noise = noise
+    
+    def is_safe(self, geng, direction):
+        s = geng.snake
+        dv = s.dir_v[direction]
+        cell = tuple(h + d for h, d in zip(s.head_cell(), dv.coords))
+        
+        if not geng.in_bbox(cell):
+            return False
+        
+        # the tail moves away in the same tick
+        n = s.occupancy.count(cell)
+        if cell == s.cells[0]:
+            n -= 1
+        return n == 0
+    
+    def next_dir(self, geng):
+        s = geng.snake
+        head = s.head_cell()
+        food = geng.food_cell
+        
+        # preferred directions first
+        wanted = []
+        for i in range(4):
+            if food[i] != head[i]:
+                wanted.append(possible_dirs[2 * i + (0 if food[i] > head[i] else 1)])
+        
+        others = [d for d in possible_dirs if d not in wanted]
+        self.rng.shuffle(others)
+        
+        if self.rng.random() < self.noise:
+            candidates = others + wanted
+        else:
+            candidates = wanted + [s.head_dir] + others
+        
+        for d in candidates:
+            if d != s.opposite_dir[s.head_dir] and self.is_safe(geng, d):
+                return d
+        return None
+
+#==============================================================================
+# Simulation results
+#==============================================================================
+
+def percentile(values, p):
+    ''' nearest rank percentile of a list of values '''
+    if not values:
+        return 0.
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100. * len(values) + 0.5)) - 1))
+    return values[k]
+
+class SimResult:
+    ''' collects the tick times grouped by snake length '''
+    
+    def __init__(self):
+        self.games = 0
+        self.ticks = 0
+        self.scores = []
+        self.wall_time = 0.
+        
+        # snake length -> list of tick times in seconds
+        self.tick_times = {}
+        
+        # traced memory peak per tick in bytes, if tracked
+        self.alloc_peaks = []
+        
+        # serialised replay size
+        self.replay_bytes = 0
+        
+        # length bin size used in the report
+        self.length_bin = 16
+    
+    def add_tick(self, length, t):
+        self.ticks += 1
+        times = self.tick_times.get(length)
+        if times is None:
+            times = []
+            self.tick_times[length] = times
+        times.append(t)
+    
+    def ticks_per_second(self):
+        return self.ticks / self.wall_time if self.wall_time else 0.
+    
+    def all_times(self):
+        return [t for times in self.tick_times.values() for t in times]
+    
+    def as_dict(self):
+        all_times = self.all_times()
+        d = {"games" : self.games,
+             "ticks" : self.ticks,
+             "ticks_per_s" : self.ticks_per_second(),
+             "mean_score" : sum(self.scores) / max(1, len(self.scores)),
+             "max_score" : max(self.scores) if self.scores else 0,
+             "p50_tick_us" : percentile(all_times, 50) * 1e6,
+             "p95_tick_us" : percentile(all_times, 95) * 1e6,
+             "replay_bytes" : self.replay_bytes}
+        
+        if self.alloc_peaks:
+            d["alloc_peak_per_tick"] = sum(self.alloc_peaks) / len(self.alloc_peaks)
+        
+        d["p95_tick_us_by_length"] = {length : percentile(times, 95) * 1e6
+                                      for length, times in sorted(self.tick_times.items())}
+        return d
+    
+    def __str__(self):
+        d = self.as_dict()
+        s = f"games: {d['games']} ticks: {d['ticks']} "
+        s += f"ticks/s: {d['ticks_per_s']:.0f} score mean: {d['mean_score']:.1f} "
+        s += f"max: {d['max_score']}\n"
+        s += f"tick p50: {d['p50_tick_us']:.1f} us p95: {d['p95_tick_us']:.1f} us\n"
+        
+        if "alloc_peak_per_tick" in d:
+            s += f"allocation peak per tick: {d['alloc_peak_per_tick']:.0f} bytes\n"
+        if self.replay_bytes:
+            s += f"replay bytes: {self.replay_bytes}\n"
+        
+        s += "   length   ticks  p95 (us)\n"
+        for low, times in self.binned_times():
+            lengths = f"{low}-{low + self.length_bin - 1}"
+            s += f"{lengths:>9} {len(times):>7} {percentile(times, 95) * 1e6:>9.1f}\n"
+        return s
+    
+    def binned_times(self):
+        ''' tick times grouped in bins of snake lengths '''
+        bins = {}
+        for length, times in self.tick_times.items():
+            low = length - length % self.length_bin
+            bins.setdefault(low, []).extend(times)
+        return sorted(bins.items())
+
+#==============================================================================
+# Simulator
+#==============================================================================
+
+class Simulator:
+    ''' Plays n games headless and measures the ticks
+
+    Keyword arguments:
+    seed -- seed of the random generator of the games and policies
+    policy -- "greedy", "random" or a function rng -> policy object
+    max_ticks -- a game is stopped after these ticks
+    serialise -- writes every frame in a compact replay buffer
+    track_alloc -- measures the allocation peak per tick with tracemalloc,
+                   slows down everything
+    '''
+    
+    policies = {"greedy" : GreedyPolicy, "random" : RandomPolicy}
+    
+    def __init__(self, seed = 0, policy = "greedy", max_ticks = 2000,
+                 serialise = False, track_alloc = False):
+        self.rng = random.Random(seed)
+        self.policy_factory = self.policies.get(policy, policy)
+        self.max_ticks = max_ticks
+        self.serialise = serialise
+        self.track_alloc = track_alloc
+    
+    def play_game(self, result):
+        geng = g_eng.GameEngine(self.rng)
+        policy = self.policy_factory(self.rng)
+        
+        buf = bytearray()
+        bf = bfh.BinaryFile(buf)
+        writer = sk4.ReplayWriter()
+        
+        timer = time.perf_counter
+        ticks = 0
+        while geng.state == g_eng.GameEngine.gamestate_run and ticks < self.max_ticks:
+            next_dir = policy.next_dir(geng)
+            
+            if self.track_alloc:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            
+            start = timer()
+            
+            if next_dir:
+                geng.snake.change_dir(next_dir)
+            geng.routine()
+            
+            if self.serialise:
+                writer.write_frame(bf, geng.p_list)
+            
+            t = timer() - start
+            
+            if self.track_alloc:
+                result.alloc_peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            
+            result.add_tick(len(geng.snake.cells), t)
+            ticks += 1
+        
+        result.games += 1
+        result.scores.append(geng.score)
+        result.replay_bytes += len(buf)
+    
+    def run(self, n_games):
+        result = SimResult()
+        
+        if self.track_alloc:
+            tracemalloc.start()
+        
+        start = time.perf_counter()
+        for i in range(n_games):
+            self.play_game(result)
+        result.wall_time = time.perf_counter() - start
+        
+        if self.track_alloc:
+            tracemalloc.stop()
+        
+        return result
+
+
+if __name__ == "__main__":
+    
+    sim = Simulator(seed=0, serialise=True)
+    print(sim.run(20))
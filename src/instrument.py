@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:02:44 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+# py imports
+import time
+import functools
+import collections
+import json
+import csv
+
+#==============================================================================
+# Instrumentation
+#   named timers around the hot paths, the durations are collected in rolling
+#   histograms. The timers cost a flag check when disabled and can be
+#   switched on and off while the game runs.
+#
+#   @instrument.timed("name") wraps a function
+#==============================================================================
+
+# is the instrumentation collecting samples
+enabled = False
+
+# number of samples kept by each histogram
+window = 512
+
+# name -> Histogram
+histograms = {}
+
+def set_enabled(flag):
+    global enabled
+    enabled = bool(flag)
+
+def toggle():
+    set_enabled(not enabled)
+    return enabled
+
+def reset():
+    histograms.clear()
+
+#==============================================================================
+# Rolling histogram
+#   keeps the last window samples (in seconds) and the total count
+#==============================================================================
+
+class Histogram:
+
+    def __init__(self, name, size = window):
+        self.name = name
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+        self.total = 0.
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q, ordered = None):
+        if ordered is None:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return 0.
+        idx = min(len(ordered) - 1, int(q / 100 * len(ordered)))
+        return ordered[idx]
+
+    def stats(self):
+        ''' statistics of the window in milliseconds '''
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return {"name" : self.name,
+                "count" : self.count,
+                "window" : n,
+                "mean_ms" : sum(ordered) / n * 1e3 if n else 0.,
+                "p50_ms" : self.percentile(50, ordered) * 1e3,
+                "p95_ms" : self.percentile(95, ordered) * 1e3,
+                "max_ms" : ordered[-1] * 1e3 if n else 0.,
+                "total_s" : self.total}
+
+def get_histogram(name):
+    h = histograms.get(name)
+    if h is None:
+        h = Histogram(name)
+        histograms[name] = h
+    return h
+
+def add_sample(name, seconds):
+    get_histogram(name).add(seconds)
+
+#==============================================================================
+# Timers
+#==============================================================================
+
+def timed(name):
+    ''' decorator that times every call of the function when enabled '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_sample(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+#==============================================================================
+# Reports and exporters
+#==============================================================================
+
+def snapshot():
+    ''' the statistics of all the timers, sorted by name '''
+    return [histograms[name].stats() for name in sorted(histograms)]
+
+def report():
+    lines = []
+    for s in snapshot():
+        lines.append(f"{s['name']:<28} n {s['count']:7d} "
+                     f"p50 {s['p50_ms']:7.3f} ms "
+                     f"p95 {s['p95_ms']:7.3f} ms "
+                     f"max {s['max_ms']:8.3f} ms")
+    return "\n".join(lines)
+
+def export_json(filename):
+    ''' writes the statistics and the samples window of each timer '''
+    data = {}
+    for s in snapshot():
+        h = histograms[s["name"]]
+        s["samples_ms"] = [v * 1e3 for v in h.samples]
+        data[s["name"]] = s
+
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=1)
+
+def export_csv(filename):
+    ''' writes one row of statistics per timer '''
+    fields = ["name", "count", "window", "mean_ms", "p50_ms", "p95_ms",
+              "max_ms", "total_s"]
+
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for s in snapshot():
+            writer.writerow(s)
+
+#==============================================================================
+# Overlay
+#   shows the report in a corner of a canvas, the text item is created once
+#   and updated, hidden when the instrumentation is off
+#==============================================================================
+
+class Overlay:
+
+    def __init__(self, canvas, x = 5, y = 5):
+        self.canvas = canvas
+        self.item_n = canvas.create_text(x, y, text="", anchor="nw",
+                                         font=("Courier", 8), fill="gray25")
+
+    def update(self):
+        if enabled:
+            lines = []
+            for s in snapshot():
+                lines.append(f"{s['name']:<24} {s['p50_ms']:6.2f} "
+                             f"{s['p95_ms']:6.2f} ms")
+            self.canvas.itemconfig(self.item_n, text="\n".join(lines),
+                                   state="normal")
+        else:
+            self.canvas.itemconfig(self.item_n, state="hidden")
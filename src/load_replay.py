@@ -5,8 +5,16 @@ Created on Mon Jun  1 19:18:01 2020
 @author: maurop
 """
 
+# py imports
+import os
+import mmap
+import struct
+import collections
+
+# project imports
 import bfh
 import poly
+import sk4
 
 def str_file_size(size):
     ''' Puts the file size in the 1 kb format instead of 1000 b'''
@@ -35,41 +43,162 @@ def str_file_size(size):
     return f"{value} b"
 
 
+# =============================================================================
+# Frame index
+#   a replay file is a series of frames, each frame is the number of polygons
+#   followed by the polygons as written by Polygon.as_bytes
+# =============================================================================
+
+uint = struct.Struct("I")
+
+def scan_frames(buf, n_bytes):
+    ''' Walks the replay buffer reading only the lengths and returns the 
+    offset of every frame. A truncated frame at the end is left out '''
+    read_uint = uint.unpack_from
+    offsets = []
+    co = 0
+    
+    try:
+        while co < n_bytes:
+            start = co
+            
+            p_list_len = read_uint(buf, co)[0]
+            co += 4
+            
+            for i in range(p_list_len):
+                # color string
+                co += 4 + read_uint(buf, co)[0]
+                
+                # vertexes, each one is the dimension followed by the coords
+                v_len = read_uint(buf, co)[0]
+                co += 4
+                for j in range(v_len):
+                    co += 4 + 8 * read_uint(buf, co)[0]
+                
+                # edge and face arrays
+                co += 4 + 4 * read_uint(buf, co)[0]
+                co += 4 + 4 * read_uint(buf, co)[0]
+            
+            if co > n_bytes:
+                break
+            
+            offsets.append(start)
+    except struct.error:
+        pass
+    
+    return offsets
+
+class LegacyFrames:
+    ''' Frame decoder of a legacy replay buffer, where every frame stores 
+    all the polygons '''
+    
+    def __init__(self, buf):
+        self.buf = buf
+        self.offsets = scan_frames(buf, len(buf))
+    
+    def __len__(self):
+        return len(self.offsets)
+    
+    def decode(self, i):
+        bf = bfh.BinaryFile(self.buf, self.offsets[i])
+        
+        p_list_len = bf.read("I")
+        
+        p_list = [poly.Polygon() for i in range(p_list_len)]
+
+        for p in p_list:
+            p.interpret_bytes(bf)
+        
+        return p_list
+
+class ReplayFrames:
+    ''' Sequence of the frames of a replay file, the frames are decoded from
+    the buffer only when asked and the last decoded ones are kept in a small
+    LRU cache '''
+    
+    cache_size = 64
+    
+    def __init__(self, decoder = None):
+        # the decoder is either a LegacyFrames or a sk4.FramesV2
+        self.decoder = decoder
+        
+        self.cache = collections.OrderedDict()
+    
+    def __len__(self):
+        return len(self.decoder) if self.decoder else 0
+    
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        
+        if i < 0 or i >= len(self):
+            raise IndexError("replay frame out of range")
+        
+        p_list = self.cache.get(i)
+        
+        if p_list is None:
+            p_list = self.decoder.decode(i)
+            
+            self.cache[i] = p_list
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(i)
+        
+        return p_list
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
 class LoadReplay:
     ''' This class loads a replay file'''
     
     def __init__(self):
         # contains the frames
-        self.frames = []
+        self.frames = ReplayFrames()
         
         # marks which frame is the frame selected
         self.current_frame = 0
         
-    def load_replay_file(self, filename):
-        ''' Loads the replay file and appends it to the frames'''
-        self.frames = []
+        # the memory map of the loaded file
+        self.buf = None
         
-        with open(filename, "rb") as f:
-            bf = bfh.BinaryFile(f)
-            
-            n_bytes = len(f.read())
-            
+    def load_replay_file(self, filename, verbose = True):
+        ''' Maps the replay file in memory and indexes its frames, the frames
+        are decoded when requested. verbose prints the file size and the
+        number of frames'''
+        self.close()
+        
+        n_bytes = os.path.getsize(filename)
+        
+        if verbose:
             print("Replay file size:", str_file_size(n_bytes))
-            
-            while bf.co < n_bytes:
-            
-                # read frame
-                p_list_len = bf.read("I")
-                
-                p_list = [poly.Polygon() for i in range(p_list_len)]
         
-                for p in p_list:
-                    p.interpret_bytes(bf)
+        # an empty file can not be mapped
+        if n_bytes > 0:
+            with open(filename, "rb") as f:
+                self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
             
-                self.frames.append(p_list)
+            # the version 2 files start with a magic
+            if sk4.is_sk4v2(self.buf):
+                decoder = sk4.FramesV2(self.buf)
+            else:
+                decoder = LegacyFrames(self.buf)
+        
+            self.frames = ReplayFrames(decoder)
             
+        if verbose:
             print("Frames loaded:", len(self.frames))
     
+    def close(self):
+        ''' Releases the memory map of the current file '''
+        self.frames = ReplayFrames()
+        
+        if self.buf is not None:
+            self.buf.close()
+            self.buf = None
+    
     def next_frame(self):
         ''' increments the frame and returns the current frame'''
         if self.current_frame + 1 < len(self.frames):
@@ -93,4 +222,37 @@ class LoadReplay:
         
     def get_frame(self):
         ''' gets the current frame'''
-        return self.frames[self.current_frame]
\ No newline at end of file
+        return self.frames[self.current_frame]
+
+
+def open_replay(filename, verbose = True):
+    ''' Returns a LoadReplay with the file loaded '''
+    replay = LoadReplay()
+    replay.load_replay_file(filename, verbose)
+    return replay
+
+def convert_replay(filename, new_filename, keyframe_interval = 64):
+    ''' Converts a replay file (legacy or version 2) in the compact version 2
+    format '''
+    replay = LoadReplay()
+    replay.load_replay_file(filename)
+    
+    writer = sk4.ReplayWriter(keyframe_interval)
+    
+    with open(new_filename, "wb") as f:
+        bf = bfh.BinaryFile(f)
+        for p_list in replay.frames:
+            writer.write_frame(bf, p_list)
+    
+    replay.close()
+
+
+if __name__ == "__main__":
+    
+    import sys
+    
+    if len(sys.argv) != 3:
+        print("usage: python load_replay.py replay.sk4 converted.sk4")
+    else:
+        convert_replay(sys.argv[1], sys.argv[2])
+        print("Converted size:", str_file_size(os.path.getsize(sys.argv[2])))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:21:33 2026
+
+@author: maurop
+"""
+
+#==============================================================================
+# Occupancy of the integer lattice
+#   the snake segments are unit hypercubes centered on integer coordinates,
+#   so the snake can be described by the cells it occupies. The cells are
+#   kept in a dictionary (cell -> number of segments on it) and the free 
+#   cells of a region (where the food can spawn) in a list, with a cell -> 
+#   position index so that a cell can be removed by swapping it with the last
+#==============================================================================
+
+class Occupancy:
+    ''' Counts how many snake segments are on each cell, all the operations
+    are O(1) '''
+    
+    def __init__(self):
+        # cell (tuple of 4 ints) -> number of segments
+        self.cells = {}
+        
+        # free cells of the region and their position in the list
+        self.free = []
+        self.free_idx = {}
+        
+        # region bounds, lower included, higher excluded
+        self.low = None
+        self.high = None
+    
+    def count(self, cell):
+        return self.cells.get(cell, 0)
+    
+    def add(self, cell):
+        n = self.cells.get(cell, 0)
+        self.cells[cell] = n + 1
+        
+        if n == 0 and cell in self.free_idx:
+            self.remove_free(cell)
+    
+    def remove(self, cell):
+        n = self.cells[cell] - 1
+        
+        if n == 0:
+            del self.cells[cell]
+            if self.in_region(cell):
+                self.add_free(cell)
+        else:
+            self.cells[cell] = n
+    
+    # region utilities
+    
+    def in_region(self, cell):
+        if self.low is None:
+            return False
+        
+        for c in cell:
+            if c < self.low or c >= self.high:
+                return False
+        return True
+    
+    def set_region(self, low, high):
+        ''' the region is the hypercube of cells with all the coordinates in 
+        range(low, high) '''
+        self.low = low
+        self.high = high
+        
+        self.free = []
+        self.free_idx = {}
+        
+        r = range(low, high)
+        for x in r:
+            for y in r:
+                for z in r:
+                    for w in r:
+                        cell = (x, y, z, w)
+                        if cell not in self.cells:
+                            self.add_free(cell)
+    
+    def add_free(self, cell):
+        self.free_idx[cell] = len(self.free)
+        self.free.append(cell)
+    
+    def remove_free(self, cell):
+        # swap the cell with the last one and pop
+        i = self.free_idx.pop(cell)
+        last = self.free.pop()
+        if last != cell:
+            self.free[i] = last
+            self.free_idx[last] = i
+    
+    def random_free(self, rng):
+        ''' returns a random free cell of the region '''
+        return self.free[rng.randrange(len(self.free))]
@@ -12,6 +12,9 @@ Created on Thu May 17 15:34:47 2018
 import vec
 import bfh
 
+class PolyExcept(Exception):
+    pass
+
 #==============================================================================
 # Polygon class
 # simple utility for the polygon class
@@ -26,6 +29,10 @@ class Polygon:
         self.f_list = []
         self.color = "red"
     
+    def coords(self):
+        ''' the vertexes coordinates as a flat list '''
+        return [c for v in self.v_list for c in v.coords]
+    
     def as_bytes(self, bf):
         ''' writes the polygon '''
         
@@ -47,26 +54,19 @@ class Polygon:
             earr.append(e[1])
         
         # write that array
-        earrlen = len(earr)
-        bf.write("I", earrlen)
-        for e in earr:
-            bf.write("I", e)
+        bf.write("I", len(earr))
+        bf.write_array("I", earr)
         
         # write face list
 
         # transform it in a linear array
         farr = []
         for f in self.f_list:
-            farr.append(f[0])
-            farr.append(f[1])
-            farr.append(f[2])
-            farr.append(f[3])
+            farr.extend(f[:4])
         
         # then write it
-        farrlen = len(farr)
-        bf.write("I", farrlen)
-        for f in farr:
-            bf.write("I", f) 
+        bf.write("I", len(farr))
+        bf.write_array("I", farr)
             
     def interpret_bytes(self, bf):
         # read the color
@@ -88,47 +88,22 @@ class Polygon:
         earrlen = bf.read("I")
         
         # read in the linear array containg the values
-        earr = []            
-        for i in range(earrlen):
-            e = bf.read("I")
-            earr.append(e)
+        earr = bf.read_array("I", earrlen)
 
         # the array is composed of a series of couples (0 1)(2 3)
         # which indicates which vertex are connected
-        half_earrlen = int(earrlen / 2)
-        
-        # initialize the edge list with 0s
-        self.e_list = [[0,0] for i in range(half_earrlen)]
-        
-        # assign those values to the initialized edge list
-        for i in range(half_earrlen):                
-            self.e_list[i][0] = earr[i*2]
-            self.e_list[i][1] = earr[i*2 + 1]
+        self.e_list = [earr[i : i + 2] for i in range(0, earrlen - 1, 2)]
 
         # read face list
         farrlen = bf.read("I")
         
         # read the linear array containgin the vertex indexes that compose a 
         # face
-        farr = []
-        for i in range(farrlen):
-            f = bf.read("I")
-            farr.append(f)
+        farr = bf.read_array("I", farrlen)
 
         # the array is composed of a series of couples (0 1 2 3)(5 6 7 8)
         # which indicates which vertex form a face
-        half_farrlen = int(farrlen / 4)
-        
-        # initialize the list
-        self.f_list = [[0, 0, 0, 0] for i in range(half_farrlen)]
-
-        # assign the values read to the face list        
-        for i in range(half_farrlen):
-            self.f_list[i][0] = farr[i*4]
-            self.f_list[i][1] = farr[i*4 + 1]
-            self.f_list[i][2] = farr[i*4 + 2]
-            self.f_list[i][3] = farr[i*4 + 3]
-        
+        self.f_list = [farr[i : i + 4] for i in range(0, farrlen - 3, 4)]
    
     
     def write_file(self, filename):
@@ -185,6 +160,36 @@ def cube3d(v1,v2):
     
     return polygon
 
+#==============================================================================
+# Hypercube topology
+#   the edges and faces are the same for every hypercube, they are shared 
+#   tuples that must not be modified. The vertexes are indexed by their
+#   corner, 0 is the lower coordinate 1 the higher, v0 is the lower corner
+#   and v1 the higher one
+#==============================================================================
+
+CUBE4D_CORNERS = ((0, 0, 0, 0), (1, 1, 1, 1), 
+                  (1, 0, 0, 0), (1, 1, 0, 0), (0, 1, 0, 0), (0, 0, 1, 0),
+                  (1, 0, 1, 0), (1, 1, 1, 0), (0, 1, 1, 0), (0, 0, 0, 1),
+                  (1, 0, 0, 1), (1, 1, 0, 1), (0, 1, 0, 1), (0, 0, 1, 1),
+                  (1, 0, 1, 1), (0, 1, 1, 1))
+
+CUBE4D_EDGES = ((0, 2), (0, 9), (2, 3), (2, 10), (3, 4), (3, 11), (4, 0),
+                (4, 12), 
+                (0, 5), (2, 6), (4, 8), (3, 7), 
+                (5, 6), (5, 13), (6, 7), (6, 14), (7, 8), (7, 1), (8, 5), 
+                (8, 15), 
+                (9, 10), (10, 11), (11, 12), (12, 9), 
+                (10, 14), (11, 1), (12, 15), (9, 13), 
+                (13, 14), (14, 1), (1, 15), (15, 13))
+
+CUBE4D_FACES = ((1, 14, 6, 7), (6, 2, 3, 7), (2, 10, 11, 3), (10, 14, 1, 11),
+                (7, 6, 5, 8), (3, 2, 0, 4), (11, 10, 9, 12), (1, 14, 13, 15),
+                (14, 6, 5, 13), (6, 2, 0, 5), (2, 10, 9, 0), (10, 14, 13, 9),
+                (1, 15, 8, 7), (8, 4, 3, 7), (4, 12, 11, 3), (12, 15, 1, 11),
+                (1, 11, 3, 7), (14, 6, 2, 10), (15, 8, 4, 12), (13, 5, 0, 9),
+                (15, 13, 5, 8), (5, 8, 4, 0), (0, 4, 12, 9), (13, 9, 12, 15))
+
 #==============================================================================
 # Generate hypercube
 #==============================================================================
@@ -193,108 +198,117 @@ def cube3d(v1,v2):
 def cube4d(v0,v1):
     polygon = Polygon()
     
-    polygon.v_list.append(v0) #v0
-    polygon.v_list.append(v1) #v1
+    polygon.v_list.append(v0)
+    polygon.v_list.append(v1)
     
-    polygon.v_list.append(vec.V4(v1[0],v0[1],v0[2],v0[3])) #v2
-    polygon.v_list.append(vec.V4(v1[0],v1[1],v0[2],v0[3])) #v3
-    polygon.v_list.append(vec.V4(v0[0],v1[1],v0[2],v0[3])) #v4
-    polygon.v_list.append(vec.V4(v0[0],v0[1],v1[2],v0[3])) #v5
-    polygon.v_list.append(vec.V4(v1[0],v0[1],v1[2],v0[3])) #v6
-    polygon.v_list.append(vec.V4(v1[0],v1[1],v1[2],v0[3])) #v7
-    polygon.v_list.append(vec.V4(v0[0],v1[1],v1[2],v0[3])) #v8
+    corners = (v0.coords, v1.coords)
+    for corner in CUBE4D_CORNERS[2:]:
+        polygon.v_list.append(vec.V4([corners[c][i] for i, c in enumerate(corner)]))
     
-    polygon.v_list.append(vec.V4(v0[0],v0[1],v0[2],v1[3])) #v9
-    polygon.v_list.append(vec.V4(v1[0],v0[1],v0[2],v1[3])) #v10
-    polygon.v_list.append(vec.V4(v1[0],v1[1],v0[2],v1[3])) #v11
-    polygon.v_list.append(vec.V4(v0[0],v1[1],v0[2],v1[3])) #v12
-    polygon.v_list.append(vec.V4(v0[0],v0[1],v1[2],v1[3])) #v13
-    polygon.v_list.append(vec.V4(v1[0],v0[1],v1[2],v1[3])) #v14
-    polygon.v_list.append(vec.V4(v0[0],v1[1],v1[2],v1[3])) #v15
+    polygon.e_list = CUBE4D_EDGES
+    polygon.f_list = CUBE4D_FACES
+
+    return polygon
+
+#==============================================================================
+# Hypercube class
+#   an hypercube stored as center and size, the topology is shared and the
+#   vertexes are computed only when someone asks for them. The hypercube
+#   should be treated as immutable, a moved cube is a new cube.
+#==============================================================================
+
+class HyperCube(Polygon):
+    '''Axis aligned hypercube, behaves as the Polygon made by cube4d'''
     
-    polygon.e_list.append((0,2))
-    polygon.e_list.append((0,9))
-    polygon.e_list.append((2,3))
-    polygon.e_list.append((2,10))
-    polygon.e_list.append((3,4))
-    polygon.e_list.append((3,11))
-    polygon.e_list.append((4,0))
-    polygon.e_list.append((4,12))
+    e_list = CUBE4D_EDGES
+    f_list = CUBE4D_FACES
     
-    polygon.e_list.append((0,5))
-    polygon.e_list.append((2,6))
-    polygon.e_list.append((4,8))
-    polygon.e_list.append((3,7))
+    def __init__(self, center, size, color):
+        self.center = tuple(center)
+        self.size = size
+        self.color = color
+        
+        # lazy vertex data
+        self._coords = None
+        self._v_list = None
     
-    polygon.e_list.append((5,6))
-    polygon.e_list.append((5,13))
-    polygon.e_list.append((6,7))
-    polygon.e_list.append((6,14))
-    polygon.e_list.append((7,8))
-    polygon.e_list.append((7,1))
-    polygon.e_list.append((8,5))
-    polygon.e_list.append((8,15))
+    def corners(self):
+        ''' lower and higher corner coordinates, computed as in 
+        create_cube4d so that the values are the same '''
+        h = self.size / 2.0
+        return ([c - h for c in self.center], [c + h for c in self.center])
     
-    polygon.e_list.append((9,10))
-    polygon.e_list.append((10,11))
-    polygon.e_list.append((11,12))
-    polygon.e_list.append((12,9))
+    def coords(self):
+        ''' the vertexes coordinates as a flat tuple, 4 floats per vertex,
+        the tuple is shared by the pooled cubes '''
+        if self._coords is None:
+            corners = self.corners()
+            coords = []
+            for corner in CUBE4D_CORNERS:
+                for i, c in enumerate(corner):
+                    coords.append(corners[c][i])
+            self._coords = tuple(coords)
+        return self._coords
     
-    polygon.e_list.append((10,14))
-    polygon.e_list.append((11,1))
-    polygon.e_list.append((12,15))
-    polygon.e_list.append((9,13))
+    @property
+    def v_list(self):
+        ''' the vertexes as a tuple, it can't be changed in place '''
+        if self._v_list is None:
+            c = self.coords()
+            self._v_list = tuple(vec.V4(list(c[i : i + 4]))
+                                 for i in range(0, len(c), 4))
+        return self._v_list
     
-    polygon.e_list.append((13,14))
-    polygon.e_list.append((14,1))
-    polygon.e_list.append((1,15))
-    polygon.e_list.append((15,13))
-
-    polygon.f_list.append((1,14,6,7))
-    polygon.f_list.append((6,2,3,7))
-    polygon.f_list.append((2,10,11,3))
-    polygon.f_list.append((10,14,1,11))
-
-    polygon.f_list.append((7,6,5,8))
-    polygon.f_list.append((3,2,0,4))
-    polygon.f_list.append((11,10,9,12))
-    polygon.f_list.append((1,14,13,15))
-
-    polygon.f_list.append((14,6,5,13))
-    polygon.f_list.append((6,2,0,5))
-    polygon.f_list.append((2,10,9,0))
-    polygon.f_list.append((10,14,13,9))
-
-    polygon.f_list.append((1,15,8,7))
-    polygon.f_list.append((8,4,3,7))
-    polygon.f_list.append((4,12,11,3))
-    polygon.f_list.append((12,15,1,11))
-
-    polygon.f_list.append((1,11,3,7))
-    polygon.f_list.append((14,6,2,10))
-    polygon.f_list.append((15,8,4,12))
-    polygon.f_list.append((13,5,0,9))
-
-    polygon.f_list.append((15,13,5,8))
-    polygon.f_list.append((5,8,4,0))
-    polygon.f_list.append((0,4,12,9))
-    polygon.f_list.append((13,9,12,15))
-
-    return polygon
+    @v_list.setter
+    def v_list(self, v_list):
+        ''' the vertexes are copied, the first two are the lower and the 
+        higher corner and give the center and the size '''
+        coords = tuple(c for v in v_list for c in v.coords)
+        if len(coords) != 64:
+            raise ValueError("HyperCube: 16 vertexes expected")
+        
+        low = coords[0 : 4]
+        high = coords[4 : 8]
+        self.center = tuple((l + h) / 2 for l, h in zip(low, high))
+        self.size = high[0] - low[0]
+        
+        self._coords = coords
+        self._v_list = None
 
 #==============================================================================
 # Generate an hypercube given a center and a size
 #==============================================================================
 
 def create_cube4d( point, size, color):
-    v = vec.V4(1, 1, 1, 1) * size/2.0
-    
-    higher = point + v
-    lower = point - v
+    return HyperCube(point.coords, size, color)
+
+#==============================================================================
+# Hypercube cells
+#   the game hypercubes are centered on the integer grid
+#==============================================================================
+
+def cube_center_size(p):
+    ''' the hypercubes store the lower and the higher corner in the first 2 
+    vertexes '''
+    low = p.v_list[0]
+    high = p.v_list[1]
+    center = [(low[i] + high[i]) / 2 for i in range(4)]
+    return center, high[0] - low[0]
+
+def to_cell(center):
+    ''' rounds a center to the integer grid '''
+    cell = tuple(int(round(c)) for c in center)
+    for c, ic in zip(center, cell):
+        if abs(c - ic) > 1e-6:
+            raise PolyExcept("Poly: polygon is not on the unit grid")
+    return cell
 
-    c = cube4d(lower,higher)
-    c.color = color
-    return c
+def polygon_cell(p):
+    ''' the grid cell of an hypercube '''
+    center = getattr(p, "center", None)
+    if center is None:
+        center = cube_center_size(p)[0]
+    return to_cell(center)
 
 
 if __name__ == "__main__":
@@ -17,11 +17,31 @@ import vec, math
 class CamExcept(Exception):
     pass
 
+#==============================================================================
+# Cached camera constants
+#   the projection constants (position, basis, scaled screen sizes) are
+#   computed once and kept until a camera attribute is assigned, which is
+#   what change_position and change_target do. The batch projections work on
+#   flat coordinate lists (x0, y0, z0, x1, ...) like rot4.apply_coords
+#==============================================================================
+
+class CachedCam:
+    
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name != "const":
+            object.__setattr__(self, "const", None)
+    
+    def constants(self):
+        if self.const is None:
+            self.const = self.calc_constants()
+        return self.const
+
 #==============================================================================
 # 3d camera
 #==============================================================================
 
-class Cam3:
+class Cam3(CachedCam):
 
     def __init__(self):
         
@@ -62,26 +82,43 @@ class Cam3:
         #B.normalize() apparently useless?
         
         return [A,B,C]
+    
+    def calc_constants(self):
+        ''' position, basis and the screen size times the view factor '''
+        T = 1 / math.tan(self.view_angle / 2)
+        A, B, C = [tuple(m.coords) for m in self.t_matrix]
+        return (tuple(self.From.coords), A, B, C, self.Lx * T, self.Cx)
 
     def prj(self,point):
         ''' project a point on the 2d screen '''
-        
-        if point == vec.V3(0, 0, 0): raise CamExcept("Cam3: point is 0")
-        
-        V = point - self.From
-
-        T = 1 / math.tan(self.view_angle / 2)
-        
-        div = V.dot(self.t_matrix[2])
-        
-        if div == 0: CamExcept("Cam3: S div is 0")
-        
-        S = T / div
-
-        Sx = self.Cx + (self.Lx * S * V.dot(self.t_matrix[0]))
-        Sy = self.Cx + (self.Lx * S * V.dot(self.t_matrix[1]))
-
-        return vec.V2(Sx,Sy)
+        return vec.V2(*self.prj_many(point.coords))
+    
+    def prj_many(self, coords):
+        ''' projects a flat list of 3d coordinates, returns the flat list 
+        of the 2d coordinates '''
+        (gx, gy, gz), a, b, c, l, cx = self.constants()
+        
+        out = []
+        append = out.append
+        for k in range(0, len(coords), 3):
+            x = coords[k]
+            y = coords[k + 1]
+            z = coords[k + 2]
+            
+            if x == 0 and y == 0 and z == 0:
+                raise CamExcept("Cam3: point is 0")
+            
+            x -= gx
+            y -= gy
+            z -= gz
+            
+            S = l / (x * c[0] + y * c[1] + z * c[2])
+            
+            # the y uses the x center and size as it always did
+            append(cx + S * (x * a[0] + y * a[1] + z * a[2]))
+            append(cx + S * (x * b[0] + y * b[1] + z * b[2]))
+        
+        return out
     
     # changing position of the target or form means to calculate the transform
     # matrix again
@@ -98,7 +135,7 @@ class Cam3:
 # 4d Camera
 #==============================================================================
 
-class Cam4:
+class Cam4(CachedCam):
     
     def __init__(self):
         self.From = vec.V4(10, 0, 0, 0)
@@ -137,21 +174,44 @@ class Cam4:
         if C.magnitude() == 0: raise CamExcept("Cam4: C module is 0")
 
         return [A,B,C,D]    
+    
+    def calc_constants(self):
+        ''' position, basis, screen sizes times the view factor and 
+        screen center '''
+        T = 1/(math.tan(self.view_angle)/2)
+        A, B, C, D = [tuple(m.coords) for m in self.t_matrix]
+        return (tuple(self.From.coords), A, B, C, D, 
+                (self.Lx * T, self.Ly * T, self.Lz * T),
+                (self.Bx, self.By, self.Bz))
  
     def prj(self, point):
         '''project the a 4d point into a 3d cube screen'''
-        point = point - self.From
-        if point == vec.V4(0, 0, 0, 0): raise CamExcept("Cam4: prj point null vec")
-        
-        T = 1/(math.tan(self.view_angle)/2)
-        
-        S = T / (point.dot(self.t_matrix[3]))
-        
-        x = self.Bx + (self.Lx * S * point.dot(self.t_matrix[0]))
-        y = self.By + (self.Ly * S * point.dot(self.t_matrix[1]))
-        z = self.Bz + (self.Lz * S * point.dot(self.t_matrix[2]))
-        
-        return vec.V3(x,y,z)
+        return vec.V3(*self.prj_many(point.coords))
+    
+    def prj_many(self, coords):
+        ''' projects a flat list of 4d coordinates, returns the flat list
+        of the 3d coordinates '''
+        f, a, b, c, d, (lx, ly, lz), (bx, by, bz) = self.constants()
+        fx, fy, fz, fw = f
+        
+        out = []
+        append = out.append
+        for k in range(0, len(coords), 4):
+            px = coords[k] - fx
+            py = coords[k + 1] - fy
+            pz = coords[k + 2] - fz
+            pw = coords[k + 3] - fw
+            
+            if px == 0 and py == 0 and pz == 0 and pw == 0:
+                raise CamExcept("Cam4: prj point null vec")
+            
+            S = 1 / (px * d[0] + py * d[1] + pz * d[2] + pw * d[3])
+            
+            append(bx + lx * S * (px * a[0] + py * a[1] + pz * a[2] + pw * a[3]))
+            append(by + ly * S * (px * b[0] + py * b[1] + pz * b[2] + pw * b[3]))
+            append(bz + lz * S * (px * c[0] + py * c[1] + pz * c[2] + pw * c[3]))
+        
+        return out
 
     def change_target(self, t):
         self.To = t
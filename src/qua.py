@@ -10,7 +10,7 @@ Created on Wed May 16 23:46:53 2018
 #==============================================================================
 
 import math, vec
-import copy
+import functools
 
 class Q(vec.V4):
     ''' Quaternion class '''
@@ -36,38 +36,15 @@ class Q(vec.V4):
         return self
     
     def cross(self, q2):
-        ''' cross product between quaternions '''
-        s1 = self.w()
-        s2 = q2.w()
-
-        v1 = vec.V3(self.x(), self.y(), self.z())
-        v2 = vec.V3(  q2.x(),   q2.y(),   q2.z())
-        
-        s3 = s1 * s2 - (v1.dot(v2))
-        
-        v3 = (v2 * s1 + v1 * s2) + v1.cross(v2)
-
-        return Q(s3, v3)
+        ''' cross product between quaternions, is the hamilton product '''
+        return self.hamilton(q2)
     
     def hamilton(self, q):
-        ''' hamilton multiplication '''
-        a1 = self.w()
-        a2 = q.w()
-        
-        b1 = self.x()
-        b2 = q.x()
-        
-        c1 = self.y()
-        c2 = q.y()
-        
-        d1 = self.z()
-        d2 = q.z()
-        
-        w = a1 * a2 - b1 * b2 - c1 * c2 - d1 * d2
-        x = a1 * b2 + b1 * a2 + c1 * d2 - d1 * c2
-        y = a1 * c2 - b1 * d2 + c1 * a2 + d1 * b2
-        z = a1 * d2 + b1 * c2 - c1 * b2 + d1 * a2
+        ''' hamilton multiplication, done on the (w, x, y, z) tuples '''
+        x1, y1, z1, w1 = self.coords
+        x2, y2, z2, w2 = q.coords
         
+        w, x, y, z = hamilton((w1, x1, y1, z1), (w2, x2, y2, z2))
         return Q(w, x, y, z)
   
     def get_vector(self):
@@ -75,22 +52,63 @@ class Q(vec.V4):
         return vec.V3(self.x(), self.y(), self.z())
         
     
+#==============================================================================
+# Rotation fast path
+#   the quaternions are tuples of floats (w, x, y, z), the rotation 
+#   quaternion of an axis and angle is computed once and cached, the points
+#   are rotated with the expanded q p q* product
+#==============================================================================
+
+# how many rotation quaternions are kept in the cache
+cache_size = 64
+
+def hamilton(q1, q2):
+    ''' hamilton product of two (w, x, y, z) tuples '''
+    a1, b1, c1, d1 = q1
+    a2, b2, c2, d2 = q2
+    return (a1 * a2 - b1 * b2 - c1 * c2 - d1 * d2,
+            a1 * b2 + b1 * a2 + c1 * d2 - d1 * c2,
+            a1 * c2 - b1 * d2 + c1 * a2 + d1 * b2,
+            a1 * d2 + b1 * c2 - c1 * b2 + d1 * a2)
+
+@functools.lru_cache(maxsize=cache_size)
+def _rotation_quaternion(ax, ay, az, angle):
+    n = math.sqrt(ax * ax + ay * ay + az * az)
+    s = math.sin(angle / 2) / n
+    return (math.cos(angle / 2), ax * s, ay * s, az * s)
+
+def rotation_quaternion(axis, angle):
+    ''' unit quaternion rotating of angle around axis, the axis is any 
+    sequence of 3 numbers and is not modified '''
+    ax, ay, az = axis
+    return _rotation_quaternion(ax, ay, az, angle)
+
+def rotate_coords(q, coords):
+    ''' rotates a flat list of 3d coordinates (x0, y0, z0, x1, ...) with the
+    unit quaternion q, returns a new flat list '''
+    w, x, y, z = q
+    
+    res = []
+    append = res.append
+    for k in range(0, len(coords), 3):
+        px = coords[k]
+        py = coords[k + 1]
+        pz = coords[k + 2]
+        
+        # t = 2 (u x p), p' = p + w t + u x t
+        tx = 2 * (y * pz - z * py)
+        ty = 2 * (z * px - x * pz)
+        tz = 2 * (x * py - y * px)
+        
+        append(px + w * tx + y * tz - z * ty)
+        append(py + w * ty + z * tx - x * tz)
+        append(pz + w * tz + x * ty - y * tx)
+    return res
+
 def rot_around_axis(point, axis, angle):
     ''' function that rotates a point around a given axis '''
-    
-    axis.normalize()
-    
-    # construct the quaternion
-    s = math.cos(angle / 2)
-    v = axis * math.sin(angle /2)
-    
-    q = Q(s, v)
-    qi = copy.deepcopy(q).qi()
-    
-    p = Q(0, point)
-    
-    prot = q.cross(p).cross(qi)
-    return vec.V3(prot.x(), prot.y(), prot.z())
+    q = rotation_quaternion(axis.coords, angle)
+    return vec.V3(rotate_coords(q, point.coords))
         
 if __name__ == "__main__":
     
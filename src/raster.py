@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:48:19 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+# py imports
+import struct
+import zlib
+import math
+
+#==============================================================================
+# Raster
+#   draws the projected edges of a frame in a RGB pixel buffer instead of
+#   creating a canvas item for each edge. The buffer can be given to a tk
+#   PhotoImage as PPM data in one call, or saved as PPM or PNG without tk.
+#
+#   The lines are drawn in runs: a line mostly horizontal is split in one
+#   horizontal run for each row it crosses, and each run is a single slice
+#   assignment in the buffer
+#==============================================================================
+
+# the colors used by the game, as the tk (X11) color names
+color_table = {"black" : (0, 0, 0),
+               "white" : (255, 255, 255),
+               "red" : (255, 0, 0),
+               "green" : (0, 255, 0),
+               "blue" : (0, 0, 255),
+               "lightgreen" : (144, 238, 144),
+               "darkorange3" : (205, 102, 0),
+               "gray25" : (64, 64, 64),
+               "gray85" : (217, 217, 217)}
+
+# default background of the tk canvas
+background = "#d9d9d9"
+
+class RasterExcept(Exception):
+    pass
+
+def color_rgb(color):
+    ''' converts a color name or a #rrggbb string to a bytes triplet '''
+    if color.startswith("#") and len(color) == 7:
+        return bytes.fromhex(color[1:])
+
+    rgb = color_table.get(color.lower())
+    if rgb is None:
+        raise RasterExcept("Raster: unknown color " + color)
+    return bytes(rgb)
+
+def clip_line(x0, y0, x1, y1, xmin, ymin, xmax, ymax):
+    ''' Liang-Barsky clipping of a segment to a box, returns the clipped
+    end points or None if the segment is outside '''
+    dx = x1 - x0
+    dy = y1 - y0
+    t0 = 0.
+    t1 = 1.
+
+    for p, q in ((-dx, x0 - xmin), (dx, xmax - x0),
+                 (-dy, y0 - ymin), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+        else:
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return None
+                if t > t0:
+                    t0 = t
+            else:
+                if t < t0:
+                    return None
+                if t < t1:
+                    t1 = t
+
+    return (x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy)
+
+def png_chunk(tag, data):
+    chunk = tag + data
+    return (struct.pack(">I", len(data)) + chunk +
+            struct.pack(">I", zlib.crc32(chunk) & 0xffffffff))
+
+class Raster:
+    '''
+    Raster
+
+    RGB buffer of width x height pixels, the origin is the top left corner
+    as in the tk canvas
+
+    Public methods:
+        clear -- fills the buffer with the background
+        line -- draws a line
+        rect -- draws a filled rectangle
+        draw_polygons -- draws the edges of a list of 2d polygons
+        ppm -- the buffer as PPM (P6) data
+        png -- the buffer as PNG data
+        save -- writes a .ppm or .png file
+    '''
+
+    def __init__(self, width, height, bg = background):
+        self.width = int(width)
+        self.height = int(height)
+        self.bg = color_rgb(bg)
+
+        self.buf = bytearray(self.bg * (self.width * self.height))
+
+        # color name -> bytes, the names are converted once
+        self.colors = {}
+
+    def rgb(self, color):
+        c = self.colors.get(color)
+        if c is None:
+            c = color_rgb(color)
+            self.colors[color] = c
+        return c
+
+    def clear(self):
+        self.buf[:] = self.bg * (self.width * self.height)
+
+    def hrun(self, y, x0, x1, rgb):
+        ''' sets the pixels x0..x1 (included) of the row y '''
+        if y < 0 or y >= self.height:
+            return
+        if x0 < 0:
+            x0 = 0
+        if x1 >= self.width:
+            x1 = self.width - 1
+        if x1 < x0:
+            return
+
+        start = (y * self.width + x0) * 3
+        self.buf[start : start + (x1 - x0 + 1) * 3] = rgb * (x1 - x0 + 1)
+
+    def line(self, x0, y0, x1, y1, rgb):
+        ''' draws a 1 pixel line between two points in pixel units, the
+        line is clipped to the buffer first, so that a point close to the 
+        camera doesn't make a run of millions of rows '''
+        if not (math.isfinite(x0) and math.isfinite(y0) and
+                math.isfinite(x1) and math.isfinite(y1)):
+            return
+
+        # half a pixel of margin, the end points are rounded
+        clipped = clip_line(x0, y0, x1, y1, -0.5, -0.5,
+                            self.width - 0.5, self.height - 0.5)
+        if clipped is None:
+            return
+        x0, y0, x1, y1 = clipped
+
+        dx = x1 - x0
+        dy = y1 - y0
+
+        if abs(dx) >= abs(dy):
+            # mostly horizontal, one run for each row
+            if x0 > x1:
+                x0, y0, x1, y1 = x1, y1, x0, y0
+                dy = -dy
+                dx = -dx
+
+            ix0 = int(round(x0))
+            ix1 = int(round(x1))
+            iy0 = int(round(y0))
+            iy1 = int(round(y1))
+
+            if iy0 == iy1:
+                self.hrun(iy0, ix0, ix1, rgb)
+                return
+
+            # the line leaves the row y where it crosses y + step / 2, the
+            # pixels before that column are the run of the row
+            step = 1 if iy1 > iy0 else -1
+            m = dx / dy
+            start = ix0
+            for y in range(iy0, iy1, step):
+                end = min(math.ceil(x0 + (y + 0.5 * step - y0) * m) - 1, ix1)
+                if end >= start:
+                    self.hrun(y, start, end, rgb)
+                    start = end + 1
+            self.hrun(iy1, start, ix1, rgb)
+
+        else:
+            # mostly vertical, one pixel for each row
+            if y0 > y1:
+                x0, y0, x1, y1 = x1, y1, x0, y0
+
+            iy0 = int(round(y0))
+            iy1 = int(round(y1))
+            m = dx / dy
+
+            width = self.width
+            height = self.height
+            buf = self.buf
+            for y in range(max(iy0, 0), min(iy1, height - 1) + 1):
+                x = int(round(x0 + (y - y0) * m))
+                if 0 <= x < width:
+                    i = (y * width + x) * 3
+                    buf[i : i + 3] = rgb
+
+    def rect(self, x0, y0, x1, y1, rgb):
+        ''' filled rectangle, corners in pixel units '''
+        ix0 = int(round(min(x0, x1)))
+        ix1 = int(round(max(x0, x1)))
+        iy0 = max(int(round(min(y0, y1))), 0)
+        iy1 = min(int(round(max(y0, y1))), self.height - 1)
+        for y in range(iy0, iy1 + 1):
+            self.hrun(y, ix0, ix1, rgb)
+
+    def draw_polygons(self, p2_list, transform, draw_vert = True,
+                      point_size = 3.5):
+        ''' draws the edges of the 2d polygons, transform is (kx, ky, ox, oy)
+        that maps the area units to the pixels: px = kx x + ox,
+        py = oy - ky y '''
+        kx, ky, ox, oy = transform
+        hp = point_size / 2
+
+        line = self.line
+        rect = self.rect
+        
+        # pixel keys of the edges and vertexes already drawn
+        drawn = set()
+        points = set()
+
+        for p2 in p2_list:
+            rgb = self.rgb(p2.color)
+            c = p2.coords()
+            pts = [(kx * c[k] + ox, oy - ky * c[k + 1])
+                   for k in range(0, len(c), 2)]
+
+            used = set()
+            for e in p2.e_list:
+                x0, y0 = pts[e[0]]
+                x1, y1 = pts[e[1]]
+
+                # the points behind the cameras can't be drawn
+                if not (math.isfinite(x0) and math.isfinite(y0) and
+                        math.isfinite(x1) and math.isfinite(y1)):
+                    continue
+                
+                # the overlapping edges are drawn once, the keys are the
+                # pixels the line ends on
+                k0 = (int(round(x0)), int(round(y0)))
+                k1 = (int(round(x1)), int(round(y1)))
+                key = (k0, k1, rgb) if k0 < k1 else (k1, k0, rgb)
+                if key in drawn:
+                    continue
+                drawn.add(key)
+                
+                line(x0, y0, x1, y1, rgb)
+                used.add(k0)
+                used.add(k1)
+
+            if draw_vert:
+                for v in used:
+                    if v not in points:
+                        points.add(v)
+                        x, y = v
+                        rect(x - hp, y - hp, x + hp, y + hp, rgb)
+
+    def ppm(self):
+        header = f"P6 {self.width} {self.height} 255\n".encode("ascii")
+        return header + bytes(self.buf)
+
+    def png(self):
+        row_len = self.width * 3
+        raw = bytearray()
+        for y in range(self.height):
+            raw.append(0)
+            raw.extend(self.buf[y * row_len : (y + 1) * row_len])
+
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return (b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", ihdr) +
+                png_chunk(b"IDAT", zlib.compress(bytes(raw), 6)) +
+                png_chunk(b"IEND", b""))
+
+    def save(self, filename):
+        if filename.lower().endswith(".png"):
+            data = self.png()
+        else:
+            data = self.ppm()
+
+        with open(filename, "wb") as f:
+            f.write(data)
@@ -15,9 +15,10 @@ from tkinter import (IntVar, StringVar, Toplevel, Checkbutton, Button,
                      filedialog, Label)
 
 # project imports
-import bfh
 import load_replay
 import rem_path
+import replay_writer
+import instrument
         
 # =============================================================================
 #  Replay settings
@@ -105,6 +106,10 @@ class Replay:
         # shows the play/pause string
         self.str_play = StringVar()
         
+        # writes the frames in the compact replay format from a worker 
+        # thread, so that the game loop doesn't wait for the disk
+        self.recorder = replay_writer.BackgroundWriter(self.tmp_replay_file)
+        
         # saves the last directory used
         self.previous_save_dir = rem_path.RememberPath("save_dir", "/")
         self.previous_load_dir = rem_path.RememberPath("load_path", "/")
@@ -152,17 +157,26 @@ class Replay:
     def reset_replay_file(self):
         # resets the replay file... it should be changed because more often 
         # than not overwrites replays
-        with open(self.tmp_replay_file, "wb") as f:
-            f.write(b"")        
+        self.recorder.reset()
     
+    @instrument.timed("Replay.save_replay_frame")
     def save_replay_frame(self, geng):   
-        ''' At the update game engine tick this function will append a frame
-            to the file '''
+        ''' At the update game engine tick this function will queue a frame
+            to be appended to the file '''
         if self.replay_settings.record:
-            filename = self.tmp_replay_file
-            with open(filename, "ab") as fobj:
-                replay_file = bfh.BinaryFile(fobj)
-                geng.frame_as_bytes(replay_file)    
+            self.recorder.push(geng)
+    
+    def flush(self):
+        ''' makes sure the queued frames are written in the file '''
+        self.recorder.flush()
+    
+    def close(self):
+        ''' writes the queued frames and stops the writer thread '''
+        try:
+            self.recorder.close()
+        except replay_writer.ReplayWriterExcept as e:
+            print(e)
+        print("Replay writer:", self.recorder)
     
     def load_replay(self, filename):
         # add a top level to manage the replay
@@ -216,13 +230,14 @@ class Replay:
        self.frame_number_var.set(s)
 
     def tmp_replay_file_is_empty(self):
+        self.flush()
         with open(self.tmp_replay_file, "rb") as f:
             nbytes = len(f.read())    
         return nbytes == 0
     
     def set_plist(self, p_list):
         if p_list:
-            self.game.p_list = p_list
+            self.game.set_plist(p_list)
             self.update_frame_number()
             
     # commands to control the replay
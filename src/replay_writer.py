@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:52:07 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+# py imports
+import threading
+import queue
+import time
+
+# project imports
+import bfh
+import sk4
+import g_eng
+
+#==============================================================================
+# Background replay writer
+#   the game loop only takes a snapshot of the cells (food and snake) from 
+#   the game engine and puts it in a queue, a worker thread keeps the replay
+#   file open, encodes the frames and writes them in batches.
+#
+#   If the worker fails the game loop doesn't wait for it any more, the 
+#   error is kept and raised by close
+#==============================================================================
+
+class ReplayWriterExcept(Exception):
+    pass
+
+class BackgroundWriter:
+    ''' Writes the replay frames from a worker thread
+
+    The frames are written when batch_size frames are pending, when 
+    flush_interval seconds passed since the last write, on flush and on close.
+    If the queue is full the game loop waits (no frame is lost), the waits are
+    counted in the stats. A batch that can't be written is kept and written
+    again with the next one.
+    '''
+    
+    def __init__(self, filename, max_queue = 256, batch_size = 32, 
+                 flush_interval = 1.0):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        self.queue = queue.Queue(max_queue)
+        
+        # seconds between the checks of the worker while waiting
+        self.poll_interval = 0.1
+        
+        # the first frame after a reset carries the polygons the header
+        # takes the looks from
+        self.need_header = True
+        
+        # statistics, updated by both threads
+        self.stats_lock = threading.Lock()
+        self.frames_queued = 0
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.failed = False
+        self.full_waits = 0
+        self.wait_time = 0.
+        self.error = None
+        
+        # the worker owns the file and the encoder
+        self.fobj = None
+        self.encoder = sk4.ReplayWriter()
+        
+        self.thread = threading.Thread(target=self.run, name="replay_writer",
+                                       daemon=True)
+        self.thread.start()
+    
+    # -------------------------------------------------------------------------
+    # game thread side
+    # -------------------------------------------------------------------------
+    
+    def put(self, cmd):
+        ''' queues a command, waits if the queue is full. Returns False if
+        the worker stopped and the command was dropped '''
+        try:
+            self.queue.put_nowait(cmd)
+        except queue.Full:
+            start = time.monotonic()
+            while True:
+                # the worker may die while the queue is full
+                if not self.thread.is_alive():
+                    return False
+                try:
+                    self.queue.put(cmd, timeout=self.poll_interval)
+                    break
+                except queue.Full:
+                    pass
+            
+            with self.stats_lock:
+                self.full_waits += 1
+                self.wait_time += time.monotonic() - start
+        
+        depth = self.queue.qsize()
+        with self.stats_lock:
+            if depth > self.max_depth:
+                self.max_depth = depth
+        return True
+    
+    def push(self, geng):
+        ''' queues a snapshot of the game engine cells, the frame is encoded
+        by the worker '''
+        if not self.thread.is_alive():
+            return
+        
+        # the header polygons: bbox, food and the first snake cube
+        looks = None
+        if self.need_header:
+            looks = geng.p_list[: g_eng.snake_idx + 1]
+            self.need_header = False
+        
+        if self.put(("frame", looks, geng.food_cell, tuple(geng.snake.cells))):
+            with self.stats_lock:
+                self.frames_queued += 1
+    
+    def reset(self):
+        ''' empties the replay file, the next frame starts a new replay '''
+        self.need_header = True
+        self.put(("reset", None))
+    
+    def flush(self):
+        ''' returns when all the queued frames are on the file, or when the
+        worker stopped '''
+        done = threading.Event()
+        if self.put(("flush", done)):
+            while not done.wait(self.poll_interval):
+                if not self.thread.is_alive():
+                    break
+    
+    def close(self):
+        ''' writes the remaining frames and stops the worker, raises 
+        ReplayWriterExcept if the worker failed or frames were not written '''
+        if self.put(("close", None)):
+            self.thread.join()
+        
+        if self.error is not None:
+            raise ReplayWriterExcept("Replay writer: " + self.error)
+    
+    def stats(self):
+        ''' returns a dictionary with the writer statistics '''
+        with self.stats_lock:
+            return {"frames_queued" : self.frames_queued,
+                    "frames_written" : self.frames_written,
+                    "bytes_written" : self.bytes_written,
+                    "batches" : self.batches,
+                    "queue_depth" : self.queue.qsize(),
+                    "max_queue_depth" : self.max_depth,
+                    "full_waits" : self.full_waits,
+                    "wait_time" : self.wait_time,
+                    "error" : self.error,
+                    "failed" : self.failed}
+    
+    def __str__(self):
+        s = self.stats()
+        return (f"frames: {s['frames_written']}/{s['frames_queued']} "
+                f"batches: {s['batches']} max queue: {s['max_queue_depth']} "
+                f"full waits: {s['full_waits']} ({s['wait_time']:.3f} s)")
+    
+    # -------------------------------------------------------------------------
+    # worker thread side
+    # -------------------------------------------------------------------------
+    
+    def write_pending(self, pending, n_frames):
+        ''' returns False if the frames could not be written, the error is
+        kept until a write succeeds '''
+        if not pending:
+            return True
+        
+        try:
+            if self.fobj is None:
+                self.fobj = open(self.filename, "ab")
+            self.fobj.write(pending)
+            self.fobj.flush()
+        except OSError as e:
+            self.error = f"{n_frames} frames not written: {e}"
+            if self.fobj is not None:
+                self.fobj.close()
+                self.fobj = None
+            return False
+        
+        with self.stats_lock:
+            self.frames_written += n_frames
+            self.bytes_written += len(pending)
+            self.batches += 1
+            self.error = None
+        return True
+    
+    def run(self):
+        try:
+            self.work()
+        except Exception as e:
+            with self.stats_lock:
+                self.failed = True
+                self.error = f"{e.__class__.__name__}: {e}"
+        finally:
+            if self.fobj is not None:
+                self.fobj.close()
+                self.fobj = None
+            
+            # release a flush waiting on the dead worker
+            while True:
+                try:
+                    cmd = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if cmd[0] == "flush":
+                    cmd[1].set()
+    
+    def work(self):
+        pending = bytearray()
+        n_pending = 0
+        last_write = time.monotonic()
+        
+        while True:
+            # wait for a command, if frames are pending wait at most till the
+            # next scheduled write
+            timeout = None
+            if n_pending:
+                timeout = max(0, self.flush_interval - (time.monotonic() - last_write))
+            
+            try:
+                cmd = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                cmd = ("timeout", None)
+            
+            kind = cmd[0]
+            
+            if kind == "frame":
+                bf = bfh.BinaryFile(pending, len(pending))
+                if cmd[1] is not None:
+                    self.encoder.reset()
+                    self.encoder.write_header(bf, sk4.Header().from_plist(cmd[1]))
+                self.encoder.write_state(bf, cmd[2], cmd[3])
+                n_pending += 1
+            
+            elif kind == "reset":
+                pending = bytearray()
+                n_pending = 0
+                self.encoder.reset()
+                
+                if self.fobj is not None:
+                    self.fobj.close()
+                    self.fobj = None
+                try:
+                    with open(self.filename, "wb") as f:
+                        f.write(b"")
+                except OSError as e:
+                    self.error = "replay file not reset: " + str(e)
+            
+            # write when the batch is full, on timeout and on request
+            if (n_pending >= self.batch_size or kind != "frame" or 
+                time.monotonic() - last_write >= self.flush_interval):
+                if self.write_pending(pending, n_pending):
+                    pending = bytearray()
+                    n_pending = 0
+                last_write = time.monotonic()
+            
+            if kind == "flush":
+                cmd[1].set()
+            
+            if kind != "timeout":
+                self.queue.task_done()
+            
+            if kind == "close":
+                break
@@ -10,6 +10,207 @@ Created on Fri May 18 20:44:22 2018
 #==============================================================================
 
 import mat, vec, math
+import functools
+
+#==============================================================================
+# Constants
+#==============================================================================
+
+# the angles are rounded to this step to be used as key of the rotation
+# matrix cache
+angle_quantum = 1e-9
+
+# how many composite rotation matrices are kept in the cache
+cache_size = 256
+
+#==============================================================================
+# Plane rotation matrices
+#   each function returns the nested list of a plane rotation matrix
+#==============================================================================
+
+# XY Plane rot matrix
+def m_xy(alpha):
+    return [ [  math.cos(alpha), math.sin(alpha), 0, 0],
+             [ -math.sin(alpha), math.cos(alpha), 0, 0],
+             [            0,           0, 1, 0],
+             [            0,           0, 0, 1] ]    
+
+# YZ Plane rot matrix
+def m_yz(beta):
+    return [ [ 1, 0, 0, 0],
+             [ 0, math.cos(beta), math.sin(beta), 0],
+             [ 0, -math.sin(beta), math.cos(beta), 0],
+             [ 0, 0, 0, 1] ]    
+
+# ZX Plane rot matrix
+def m_zx(gamma):
+    return [ [ math.cos(gamma), 0, -math.sin(gamma), 0],
+             [ 0, 1, 0, 0],
+             [ math.sin(gamma), 0, math.cos(gamma), 0],
+             [ 0, 0, 0, 1] ]    
+
+# XW Plane rot matrix
+def m_xw(delta):
+    return [ [ math.cos(delta), 0, 0, math.sin(delta)],
+             [ 0, 1, 0, 0],
+             [ 0, 0, 1, 0],
+             [ -math.sin(delta), 0, 0, math.cos(delta)] ]    
+
+# YW Plane rot matrix
+def m_yw(rho):
+    return [ [ 1, 0, 0, 0],
+             [ 0, math.cos(rho), 0, -math.sin(rho)],
+             [ 0, 0, 1, 0],
+             [ 0, math.sin(rho), 0, math.cos(rho)] ]    
+
+# ZW Plane rot matrix
+def m_zw(epsilon):
+    return [ [ 1, 0, 0, 0],
+             [ 0, 1, 0, 0],
+             [ 0, 0, math.cos(epsilon), -math.sin(epsilon)],
+             [ 0, 0, math.sin(epsilon), math.cos(epsilon)] ]    
+
+# the order in which the plane rotations are composed
+plane_matrices = [m_xy, m_yz, m_zx, m_xw, m_yw, m_zw]
+
+#==============================================================================
+# Composite rotation matrix
+#   the product of the 6 plane rotations is built once for a set of angles
+#   and kept in a LRU cache, the matrix is returned as a row major tuple of
+#   16 floats
+#==============================================================================
+
+@functools.lru_cache(maxsize=cache_size)
+def _composite_matrix(key):
+    mres = mat.SquareMatrix(4).get_identity()
+    
+    for m_plane, k in zip(plane_matrices, key):
+        if k != 0:
+            mres = mres * mat.SquareMatrix(m_plane(k * angle_quantum))
+    
+    return tuple(float(mres[i, j]) for i in range(4) for j in range(4))
+
+def rotation_matrix(alpha, beta, gamma, delta, rho, epsilon):
+    ''' returns the composite rotation matrix for the 6 angles '''
+    key = (round(alpha / angle_quantum), round(beta / angle_quantum),
+           round(gamma / angle_quantum), round(delta / angle_quantum),
+           round(rho / angle_quantum), round(epsilon / angle_quantum))
+    return _composite_matrix(key)
+
+def apply_coords(m, coords):
+    ''' rotates a flat list of 4d coordinates (x0, y0, z0, w0, x1, ...) with 
+    the row major matrix m, returns a new flat list '''
+    m00, m01, m02, m03, m10, m11, m12, m13, \
+    m20, m21, m22, m23, m30, m31, m32, m33 = m
+    
+    res = []
+    append = res.append
+    for k in range(0, len(coords), 4):
+        x = coords[k]
+        y = coords[k + 1]
+        z = coords[k + 2]
+        w = coords[k + 3]
+        append(m00 * x + m01 * y + m02 * z + m03 * w)
+        append(m10 * x + m11 * y + m12 * z + m13 * w)
+        append(m20 * x + m21 * y + m22 * z + m23 * w)
+        append(m30 * x + m31 * y + m32 * z + m33 * w)
+    return res
+
+def rot_many(v_list, alpha, beta, gamma, delta, rho, epsilon):
+    ''' rotates a list of 4d vectors, the rotation matrix is built only
+    once for the whole list '''
+    m = rotation_matrix(alpha, beta, gamma, delta, rho, epsilon)
+    
+    coords = []
+    for v in v_list:
+        coords.extend(v.coords)
+    
+    coords = apply_coords(m, coords)
+    return [vec.V4(coords[k : k + 4]) for k in range(0, len(coords), 4)]
+
+#==============================================================================
+# Orbit controller
+#   keeps the accumulated orientation of a 4d camera orbiting around its 
+#   target. A plane rotation changes only two rows of the orientation, so it
+#   is composed in closed form (Givens update) instead of a matrix product,
+#   the rows are orthonormalised again every reortho_interval updates to 
+#   keep the rounding drift away. The camera position and basis are the 
+#   initial ones rotated by the orientation.
+#==============================================================================
+
+# the rows changed by each rotation angle and the sign of the sine, as in the
+# plane matrices m_xy, m_yz, m_zx, m_xw, m_yw, m_zw
+givens_planes = [(0, 1, 1), (1, 2, 1), (0, 2, -1), (0, 3, 1), (1, 3, -1), 
+                 (2, 3, -1)]
+
+# number of updates between two orthonormalisations
+reortho_interval = 64
+
+class Orbit4:
+    
+    def __init__(self, cam4):
+        self.cam4 = cam4
+        
+        # initial camera, relative to the target
+        self.target = list(cam4.To.coords)
+        self.offset = [f - t for f, t in zip(cam4.From.coords, self.target)]
+        self.basis = [list(m.coords) for m in cam4.t_matrix]
+        
+        # orientation, 4 rows of 4 floats
+        self.rows = [[1. if i == j else 0. for j in range(4)] for i in range(4)]
+        
+        self.updates = 0
+    
+    def rotate(self, alpha, beta, gamma, delta, rho, epsilon):
+        ''' composes the plane rotations (radians) with the orientation, in 
+        the same order as rotation_matrix, and updates the camera '''
+        angles = (alpha, beta, gamma, delta, rho, epsilon)
+        rows = self.rows
+        
+        # the composite matrix applies the last plane first
+        for angle, (p, q, sign) in reversed(list(zip(angles, givens_planes))):
+            if angle == 0:
+                continue
+            
+            c = math.cos(angle)
+            s = math.sin(angle) * sign
+            
+            rp = rows[p]
+            rq = rows[q]
+            rows[p] = [c * a + s * b for a, b in zip(rp, rq)]
+            rows[q] = [c * b - s * a for a, b in zip(rp, rq)]
+            
+            self.updates += 1
+        
+        if self.updates >= reortho_interval:
+            self.orthonormalise()
+        
+        self.update_camera()
+    
+    def orthonormalise(self):
+        ''' Gram-Schmidt on the orientation rows '''
+        rows = []
+        for r in self.rows:
+            for u in rows:
+                d = sum(a * b for a, b in zip(r, u))
+                r = [a - d * b for a, b in zip(r, u)]
+            n = math.sqrt(sum(a * a for a in r))
+            rows.append([a / n for a in r])
+        
+        self.rows = rows
+        self.updates = 0
+    
+    def matrix(self):
+        ''' the orientation as a row major tuple, as rotation_matrix '''
+        return tuple(a for r in self.rows for a in r)
+    
+    def update_camera(self):
+        ''' sets the camera position and basis, no cross products needed '''
+        m = self.matrix()
+        
+        pos = apply_coords(m, self.offset)
+        self.cam4.From = vec.V4([p + t for p, t in zip(pos, self.target)])
+        self.cam4.t_matrix = [vec.V4(apply_coords(m, b)) for b in self.basis]
 
 #==============================================================================
 # 4d rot functions
@@ -17,64 +218,22 @@ import mat, vec, math
 #==============================================================================
 
 def rot_alpha(v, alpha):
-    mxy = [ [  math.cos(alpha), math.sin(alpha), 0, 0],
-            [ -math.sin(alpha), math.cos(alpha), 0, 0],
-            [            0,           0, 1, 0],
-            [            0,           0, 0, 1] ]    
-    
-    mxy = mat.SquareMatrix(mxy)
-    r = mxy *  mat.Matrix(v.coords)
-    return vec.V4(r[0,0], r[1,0], r[2,0], r[3,0])
+    return rot_v(v, alpha, 0, 0, 0, 0, 0)
 
 def rot_beta(v, beta):
-    myz = [ [ 1, 0, 0, 0],
-            [ 0, math.cos(beta), math.sin(beta), 0],
-            [ 0, -math.sin(beta), math.cos(beta), 0],
-            [ 0, 0, 0, 1] ]    
-    
-    myz = mat.SquareMatrix(myz)
-    r = myz *  mat.Matrix(v.coords)
-    return vec.V4(r[0,0], r[1,0], r[2,0], r[3,0])
+    return rot_v(v, 0, beta, 0, 0, 0, 0)
 
 def rot_gamma(v, gamma):
-    mzx = [ [ math.cos(gamma), 0, -math.sin(gamma), 0],
-            [ 0, 1, 0, 0],
-            [ math.sin(gamma), 0, math.cos(gamma), 0],
-            [ 0, 0, 0, 1] ]    
-    
-    mzx = mat.SquareMatrix(mzx)
-    r = mzx *  mat.Matrix(v.coords)
-    return vec.V4(r[0,0], r[1,0], r[2,0], r[3,0])
+    return rot_v(v, 0, 0, gamma, 0, 0, 0)
 
 def rot_delta(v, delta):
-    mxw = [ [ math.cos(delta), 0, 0, math.sin(delta)],
-            [ 0, 1, 0, 0],
-            [ 0, 0, 1, 0],
-            [ -math.sin(delta), 0, 0, math.cos(delta)] ]
-    
-    mxw = mat.SquareMatrix(mxw)
-    r = mxw *  mat.Matrix(v.coords)
-    return vec.V4(r[0,0], r[1,0], r[2,0], r[3,0])
+    return rot_v(v, 0, 0, 0, delta, 0, 0)
 
 def rot_rho(v, rho):
-    myw = [ [ 1, 0, 0, 0],
-            [ 0, math.cos(rho), 0, -math.sin(rho)],
-            [ 0, 0, 1, 0],
-            [ 0, math.sin(rho), 0, math.cos(rho)] ]    
-    
-    myw = mat.SquareMatrix(myw)
-    r = myw *  mat.Matrix(v.coords)
-    return vec.V4(r[0,0], r[1,0], r[2,0], r[3,0])
+    return rot_v(v, 0, 0, 0, 0, rho, 0)
 
 def rot_epsilon(v, epsilon):
-    mzw = [ [ 1, 0, 0, 0],
-            [ 0, 1, 0, 0],
-            [ 0, 0, math.cos(epsilon), -math.sin(epsilon)],
-            [ 0, 0, math.sin(epsilon), math.cos(epsilon)] ]    
-    
-    mzw = mat.SquareMatrix(mzw)
-    r = mzw *  mat.Matrix(v.coords)
-    return vec.V4(r[0,0], r[1,0], r[2,0], r[3,0])
+    return rot_v(v, 0, 0, 0, 0, 0, epsilon)
 
 #==============================================================================
 # 4d rotation all in one
@@ -83,64 +242,8 @@ def rot_epsilon(v, epsilon):
 #==============================================================================
 
 def rot_v(v, alpha, beta, gamma, delta, rho, epsilon):
-    
-    # XY Plane rot matrix
-    mxy = [ [  math.cos(alpha), math.sin(alpha), 0, 0],
-            [ -math.sin(alpha), math.cos(alpha), 0, 0],
-            [            0,           0, 1, 0],
-            [            0,           0, 0, 1] ]    
-    
-    mxy = mat.SquareMatrix(mxy)
-    
-    # YZ Plane rot matrix
-    myz = [ [ 1, 0, 0, 0],
-            [ 0, math.cos(beta), math.sin(beta), 0],
-            [ 0, -math.sin(beta), math.cos(beta), 0],
-            [ 0, 0, 0, 1] ]    
-    
-    myz = mat.SquareMatrix(myz)
-    
-    # ZX Plane rot matrix
-    mzx = [ [ math.cos(gamma), 0, -math.sin(gamma), 0],
-            [ 0, 1, 0, 0],
-            [ math.sin(gamma), 0, math.cos(gamma), 0],
-            [ 0, 0, 0, 1] ]    
-    
-    mzx = mat.SquareMatrix(mzx)
-
-    # XW Plane rot matrix
-    mxw = [ [ math.cos(delta), 0, 0, math.sin(delta)],
-            [ 0, 1, 0, 0],
-            [ 0, 0, 1, 0],
-            [ -math.sin(delta), 0, 0, math.cos(delta)] ]    
-    
-    mxw = mat.SquareMatrix(mxw)   
-    
-    # YW Plane rot matrix
-    myw = [ [ 1, 0, 0, 0],
-            [ 0, math.cos(rho), 0, -math.sin(rho)],
-            [ 0, 0, 1, 0],
-            [ 0, math.sin(rho), 0, math.cos(rho)] ]    
-    
-    myw = mat.SquareMatrix(myw) 
-    
-    # ZW Plane rot matrix
-    mzw = [ [ 1, 0, 0, 0],
-            [ 0, 1, 0, 0],
-            [ 0, 0, math.cos(epsilon), -math.sin(epsilon)],
-            [ 0, 0, math.sin(epsilon), math.cos(epsilon)] ]    
-    
-    mzw = mat.SquareMatrix(mzw)
-    
-    # multiply them
-    
-    mres = mxy * myz * mzx * mxw * myw * mzw
-    
-    mv = mat.Matrix(v.coords) # creates a 1 column matrix
-    
-    r =  mres * mv
-    
-    return vec.V4(r[0,0], r[1,0], r[2,0], r[3,0])
+    m = rotation_matrix(alpha, beta, gamma, delta, rho, epsilon)
+    return vec.V4(apply_coords(m, v.coords))
 
 
     
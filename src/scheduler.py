@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:05:31 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+import time
+
+#==============================================================================
+# Task class
+#   a function called periodically, keeps the statistics about how late the
+#   calls were
+#==============================================================================
+
+class Task:
+    '''
+    Task
+
+    a periodic callback with its timing statistics
+
+    Keyword argument:
+        name -- the name used in the report
+        period -- seconds between two calls
+        callback -- function called without arguments
+    '''
+
+    def __init__(self, name, period, callback):
+        self.name = name
+        self.period = period
+        self.callback = callback
+
+        # monotonic time of the next call
+        self.deadline = None
+
+        # statistics
+        self.calls = 0
+        self.missed = 0
+        self.jitter_sum = 0.
+        self.jitter_max = 0.
+        self.run_time = 0.
+
+        # exception raised by the callback, a failed task is not run again
+        self.failures = 0
+        self.error = None
+
+    def record(self, lateness, run_time):
+        ''' updates the statistics, a deadline is missed if the call is
+        later than a whole period '''
+        self.calls += 1
+        self.jitter_sum += lateness
+        self.run_time += run_time
+
+        if lateness > self.jitter_max:
+            self.jitter_max = lateness
+
+        if lateness > self.period:
+            self.missed += 1
+
+    def stats(self):
+        ''' returns the statistics as a dictionary, times in milliseconds '''
+        calls = max(self.calls, 1)
+        return {"calls" : self.calls,
+                "missed" : self.missed,
+                "jitter_avg_ms" : self.jitter_sum / calls * 1e3,
+                "jitter_max_ms" : self.jitter_max * 1e3,
+                "run_avg_ms" : self.run_time / calls * 1e3,
+                "failures" : self.failures,
+                "error" : repr(self.error) if self.error else None}
+
+    def __str__(self):
+        s = self.stats()
+        return (f"{self.name:<8} calls {s['calls']:6d} "
+                f"missed {s['missed']:4d} "
+                f"jitter avg {s['jitter_avg_ms']:6.2f} ms "
+                f"max {s['jitter_max_ms']:7.2f} ms "
+                f"run avg {s['run_avg_ms']:6.2f} ms" +
+                (f" FAILED: {s['error']}" if self.error else ""))
+
+#==============================================================================
+# Scheduler class
+#   runs the tasks with the tkinter after function, between the deadlines
+#   the tk main loop sleeps waiting for events
+#==============================================================================
+
+class Scheduler:
+    '''
+    Scheduler
+
+    event driven replacement of the rate polling loop, every task
+    reschedules itself at its next deadline. A task whose callback raises is
+    not scheduled again, the exception goes on to the tk error handler
+
+    Keyword argument:
+        root -- the tkinter root, or any widget with after and after_cancel
+
+    Public methods:
+        add_task -- adds a periodic task
+        start -- schedules all the tasks
+        stop -- cancels the pending calls
+        failed -- the tasks stopped by an exception
+        report -- the statistics of all the tasks as a string
+    '''
+
+    def __init__(self, root, clock=time.monotonic):
+        self.root = root
+        self.clock = clock
+
+        self.tasks = []
+
+        # task -> pending after id
+        self.pending = {}
+
+        self.running = False
+
+    def add_task(self, name, period, callback):
+        task = Task(name, period, callback)
+        self.tasks.append(task)
+
+        if self.running:
+            self.schedule(task, self.clock() + period)
+
+        return task
+
+    def start(self):
+        self.running = True
+
+        now = self.clock()
+        for task in self.tasks:
+            self.schedule(task, now + task.period)
+
+    def stop(self):
+        self.running = False
+
+        for after_id in self.pending.values():
+            self.root.after_cancel(after_id)
+        self.pending.clear()
+
+    def schedule(self, task, deadline):
+        task.deadline = deadline
+        delay = max(0, int((deadline - self.clock()) * 1000))
+        self.pending[task] = self.root.after(delay, self.run, task)
+
+    def run(self, task):
+        self.pending.pop(task, None)
+
+        if not self.running:
+            return
+
+        start = self.clock()
+        lateness = max(0., start - task.deadline)
+
+        try:
+            task.callback()
+        except Exception as e:
+            task.record(lateness, self.clock() - start)
+            task.failures += 1
+            task.error = e
+            raise
+
+        end = self.clock()
+        task.record(lateness, end - start)
+
+        # keeps the rate steady, if the task fell behind of more than a
+        # period the lost calls are skipped instead of run in a burst
+        deadline = task.deadline + task.period
+        if deadline < end:
+            deadline = end + task.period - (end - deadline) % task.period
+
+        if self.running:
+            self.schedule(task, deadline)
+
+    def failed(self):
+        return [task for task in self.tasks if task.error is not None]
+
+    def report(self):
+        return "\n".join(str(task) for task in self.tasks)
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:20:41 2026
+
+@author: maurop
+"""
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+# project imports
+import bfh
+import poly
+import vec
+import g_eng
+
+#==============================================================================
+# Compact replay format (.sk4 version 2)
+#   the legacy replay writes every polygon of every frame. In the game the
+#   polygons are always hypercubes placed on the unit grid, so the version 2
+#   stores the topology and the look (color, size) of the polygons once in
+#   the header, and for each frame only the food cell and the snake cells.
+#   The snake cells are delta encoded: the cells dropped from the tail and 
+#   the cells added to the head. Every keyframe_interval frames, or when the
+#   snake can't be described as a delta (new game), a keyframe stores all 
+#   the cells so that a frame can be rebuilt without reading the whole file.
+#
+#   file:   magic, header, frames
+#   header: version, keyframe interval, edge array, face array, 
+#           (color, size) of bbox food snake, bbox center
+#   frame:  keyframe: tag, food cell, number of cells, cells 
+#           delta:    tag, food cell, dropped cells, added cells, cells
+#==============================================================================
+
+magic = b"SK4D"
+version = 2
+
+# frame tags
+tag_keyframe = 1
+tag_delta = 2
+
+# the polygon looks in case the list has no snake cubes
+default_snake_style = ["green", 1.]
+
+# structs used in the frames
+cell_struct = bfh.get_struct("=4i")
+frame_head_struct = bfh.get_struct("=B4i")
+delta_struct = bfh.get_struct("=BB")
+
+#==============================================================================
+# Errors
+#==============================================================================
+
+class Sk4Except(Exception):
+    pass
+
+#==============================================================================
+# Helpers
+#==============================================================================
+
+def is_sk4v2(buf):
+    ''' checks the magic at the start of a buffer '''
+    return bytes(buf[0 : len(magic)]) == magic
+
+def plist_state(p_list):
+    ''' extracts the food cell and the snake cells from a game p_list '''
+    food = poly.polygon_cell(p_list[g_eng.food_idx])
+    body = [poly.polygon_cell(p) for p in p_list[g_eng.snake_idx:]]
+    return food, body
+
+#==============================================================================
+# Header
+#==============================================================================
+
+class Header:
+    ''' the static part of the replay: topology, looks and bbox position '''
+    
+    def __init__(self):
+        self.version = version
+        self.keyframe_interval = 64
+        
+        # shared hypercube topology
+        c = poly.cube4d(vec.V4(0, 0, 0, 0), vec.V4(1, 1, 1, 1))
+        self.e_list = c.e_list
+        self.f_list = c.f_list
+        
+        # [color, size] of the bbox, food and snake
+        self.styles = [["black", 6.], ["blue", 0.9], list(default_snake_style)]
+        
+        self.bbox_center = [0., 0., 0., 0.]
+    
+    def from_plist(self, p_list):
+        ''' takes the looks from the polygons of a game p_list '''
+        for i in range(min(len(p_list), g_eng.snake_idx + 1)):
+            center, size = poly.cube_center_size(p_list[i])
+            
+            # the size comes from a difference of floats
+            self.styles[i] = [p_list[i].color, round(size, 9)]
+            
+            if i == g_eng.bbox_idx:
+                self.bbox_center = center
+        return self
+    
+    def as_bytes(self, bf):
+        bf.write("I", self.version)
+        bf.write("I", self.keyframe_interval)
+        
+        earr = [i for e in self.e_list for i in e]
+        bf.write("I", len(earr))
+        bf.write_array("I", earr)
+        
+        farr = [i for f in self.f_list for i in f]
+        bf.write("I", len(farr))
+        bf.write_array("I", farr)
+        
+        for color, size in self.styles:
+            bf.write_string(color)
+            bf.write("d", size)
+        
+        bf.write_array("d", self.bbox_center)
+    
+    def interpret_bytes(self, bf):
+        self.version = bf.read("I")
+        if self.version != version:
+            raise Sk4Except("Sk4: unsupported version " + str(self.version))
+        
+        self.keyframe_interval = bf.read("I")
+        
+        earr = bf.read_array("I", bf.read("I"))
+        self.e_list = [tuple(earr[i : i + 2]) for i in range(0, len(earr) - 1, 2)]
+        
+        farr = bf.read_array("I", bf.read("I"))
+        self.f_list = [tuple(farr[i : i + 4]) for i in range(0, len(farr) - 3, 4)]
+        
+        for i in range(len(self.styles)):
+            color = bf.read_string()
+            self.styles[i] = [color, bf.read("d")]
+        
+        self.bbox_center = bf.read_array("d", 4)
+    
+    def create_cube(self, center, style_idx):
+        ''' builds a game polygon with the stored topology '''
+        color, size = self.styles[style_idx]
+        c = poly.create_cube4d(vec.V4(list(center)), size, color)
+        c.e_list = self.e_list
+        c.f_list = self.f_list
+        return c
+    
+    def build_plist(self, food, body):
+        ''' rebuilds the game p_list from the cells '''
+        p_list = [self.create_cube(self.bbox_center, g_eng.bbox_idx),
+                  self.create_cube(food, g_eng.food_idx)]
+        for cell in body:
+            p_list.append(self.create_cube(cell, g_eng.snake_idx))
+        return p_list
+
+#==============================================================================
+# Writer
+#==============================================================================
+
+class ReplayWriter:
+    ''' Appends frames to a version 2 replay, the writer remembers the 
+    previous snake to write the deltas, so the same writer must be used for
+    the whole file '''
+    
+    def __init__(self, keyframe_interval = 64):
+        self.keyframe_interval = keyframe_interval
+        self.reset()
+    
+    def reset(self):
+        ''' the next frame will start a new file '''
+        self.header = None
+        self.prev_body = None
+        self.n_frames = 0
+    
+    def write_header(self, bf, header):
+        header.keyframe_interval = self.keyframe_interval
+        self.header = header
+        bf.write_bytes(magic)
+        header.as_bytes(bf)
+    
+    def write_frame(self, bf, p_list):
+        ''' writes a frame of a game p_list '''
+        if self.header is None:
+            self.write_header(bf, Header().from_plist(p_list))
+        
+        food, body = plist_state(p_list)
+        self.write_state(bf, food, body)
+    
+    def find_delta(self, body):
+        ''' returns the number of dropped cells, if the body is the previous
+        body without some tail cells and with some new head cells '''
+        prev = self.prev_body
+        if prev is None:
+            return None
+        
+        # the snake moves by one cell a frame, so only few drops are tried
+        for dropped in range(min(3, len(prev) + 1)):
+            kept = len(prev) - dropped
+            added = len(body) - kept
+            if 0 <= added <= 255 and body[:kept] == prev[dropped:]:
+                return dropped
+        return None
+    
+    def write_state(self, bf, food, body):
+        ''' writes a frame given the food cell and the snake cells '''
+        body = [tuple(c) for c in body]
+        
+        dropped = None
+        if self.n_frames % self.keyframe_interval != 0:
+            dropped = self.find_delta(body)
+        
+        if dropped is None:
+            bf.pack(frame_head_struct, (tag_keyframe, *food))
+            bf.write("I", len(body))
+            cells = body
+        else:
+            kept = len(self.prev_body) - dropped
+            cells = body[kept:]
+            bf.pack(frame_head_struct, (tag_delta, *food))
+            bf.pack(delta_struct, (dropped, len(cells)))
+        
+        if cells:
+            bf.write_array("i", [c for cell in cells for c in cell])
+        
+        self.prev_body = body
+        self.n_frames += 1
+
+#==============================================================================
+# Reader
+#==============================================================================
+
+class FramesV2:
+    ''' Frame decoder of a version 2 replay buffer, gives the number of frames
+    and rebuilds the p_list of a frame starting from the closest keyframe '''
+    
+    def __init__(self, buf):
+        self.buf = buf
+        
+        bf = bfh.BinaryFile(buf)
+        if bf.read_bytes(len(magic)) != magic:
+            raise Sk4Except("Sk4: not a version 2 replay")
+        
+        self.header = Header()
+        self.header.interpret_bytes(bf)
+        
+        # frame offsets and the index of the keyframe each frame depends on
+        self.offsets = []
+        self.keyframes = []
+        self.scan(bf.co)
+        
+        # last rebuilt snake, makes playing forward cheap
+        self.last = None
+    
+    def __len__(self):
+        return len(self.offsets)
+    
+    def scan(self, co):
+        n_bytes = len(self.buf)
+        bf = bfh.BinaryFile(self.buf, co)
+        key = None
+        
+        while bf.co + frame_head_struct.size <= n_bytes:
+            start = bf.co
+            tag = bf.unpack(frame_head_struct)[0]
+            
+            if tag == tag_keyframe:
+                if bf.co + 4 > n_bytes:
+                    break
+                n_cells = bf.read("I")
+                key = len(self.offsets)
+            elif tag == tag_delta and key is not None:
+                if bf.co + delta_struct.size > n_bytes:
+                    break
+                n_cells = bf.unpack(delta_struct)[1]
+            else:
+                raise Sk4Except("Sk4: corrupted frame at " + str(start))
+            
+            bf.co += n_cells * cell_struct.size
+            
+            # truncated frame
+            if bf.co > n_bytes:
+                break
+            
+            self.offsets.append(start)
+            self.keyframes.append(key)
+    
+    def read_frame(self, i):
+        ''' returns tag, food, dropped, cells of a frame '''
+        bf = bfh.BinaryFile(self.buf, self.offsets[i])
+        head = bf.unpack(frame_head_struct)
+        
+        if head[0] == tag_keyframe:
+            n_cells = bf.read("I")
+            dropped = 0
+        else:
+            dropped, n_cells = bf.unpack(delta_struct)
+        
+        flat = bf.read_array("i", 4 * n_cells)
+        cells = [tuple(flat[k : k + 4]) for k in range(0, len(flat), 4)]
+        return head[0], head[1:], dropped, cells
+    
+    def body(self, i):
+        ''' rebuilds the snake cells of the frame i '''
+        key = self.keyframes[i]
+        
+        # continue from the last frame if it comes from the same keyframe
+        if self.last and key <= self.last[0] <= i:
+            start, body = self.last[0] + 1, list(self.last[1])
+        else:
+            start, body = key, []
+        
+        food = None
+        for j in range(start, i + 1):
+            tag, food, dropped, cells = self.read_frame(j)
+            if tag == tag_keyframe:
+                body = cells
+            else:
+                body = body[dropped:] + cells
+        
+        if food is None:
+            food = self.read_frame(i)[1]
+        
+        self.last = (i, body)
+        return food, body
+    
+    def decode(self, i):
+        food, body = self.body(i)
+        return self.header.build_plist(food, body)
+
+
+if __name__ == "__main__":
+    
+    import io
+    import g_eng
+    
+    geng = g_eng.GameEngine()
+    
+    fobj = io.BytesIO()
+    bf = bfh.BinaryFile(fobj)
+    writer = ReplayWriter()
+    
+    for i in range(10):
+        geng.routine()
+        writer.write_frame(bf, geng.p_list)
+    
+    frames = FramesV2(fobj.getvalue())
+    print("Frames:", len(frames), "bytes:", len(fobj.getvalue()))
+    print(plist_state(frames.decode(9)))
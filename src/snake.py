@@ -10,48 +10,119 @@ Created on Tue May 22 14:25:00 2018
 #==============================================================================
 
 import vec, poly
-import copy
+import occupancy
+import collections
 
 # to do: make segment smaller in the directions orthogonal to the direction
 #        this will make the snake less simmetric
 #        head could be a thetra hedron or half a hypersphere on top of
 #        cylinder
 
+# the body is a ring buffer (deque) of the lattice cells occupied by the 
+# segments, from the tail to the head, with a parallel ring buffer of 
+# hypercubes. Moving and growing touch only the ends of the buffers, the
+# hypercubes come from a pool indexed by the cell, since a segment in a cell
+# is always the same hypercube, so a move doesn't build any polygon once the
+# cell was visited
+
 class Snake:
     
     def __init__(self):
-        # position of the head
-        self.head_pos = vec.V4(0, 0, 0, 0)
         # direction
         self.head_dir ="UP"
         #initial size
         init_size = 4
         
-        # polygon list of the snake
-        self.p_list = []
+        # cells occupied by the segments and their hypercubes, tail first
+        self.cells = collections.deque()
+        self.cubes = collections.deque()
+        self.occupancy = occupancy.Occupancy()
+        
+        # cell -> hypercube
+        self.cube_pool = {}
+        
+        # p_list copied from the cubes, None if the body changed
+        self._p_list = None
+        
+        # every segment gets a serial number, which identifies it as long as
+        # it is in the body
+        self.serials = collections.deque()
+        self.next_serial = 0
+        
+        # changes since the last pop_changes: (serial, cube) of the added
+        # segments and the serials of the removed ones
+        self.added = []
+        self.removed = []
         
         for i in range(init_size):
-            next_cube_center = self.head_pos - vec.V4( (init_size - 1) - i, 0, 0 , 0)
-            next_cube = self.create_cube(next_cube_center)
-            self.p_list.append(next_cube)
+            self.add_cell((i - (init_size - 1), 0, 0, 0))
         
         # generate the directions vectors and forbbidden directions
         possible_dirs = ["UP", "DOWN", "LEFT", "RIGHT", "FW", "RW", "IN", "OUT"]
         
         self.dir_v = {}
+        self.dir_cell = {}
         self.opposite_dir = {}
         for i, direction in enumerate(possible_dirs):
             # generate direction vectors
             v = [0, 0, 0, 0]
             v[int(i / 2)] = 1 if i % 2 == 0 else -1
             self.dir_v[direction] = vec.V4(v)
+            self.dir_cell[direction] = tuple(v)
             
             # generate forbidden directions (ex. UP -> cant go DOWN)
             self.opposite_dir[direction] = possible_dirs[i + (1 if i % 2 == 0 else -1)]        
     
-    # create an hypercube segment
-    def create_cube(self, point):
-        return poly.create_cube4d(point, 1., "green")
+    # the hypercube of a cell, from the pool
+    def cell_cube(self, cell):
+        cube = self.cube_pool.get(cell)
+        if cube is None:
+            cube = poly.HyperCube(cell, 1., "green")
+            self.cube_pool[cell] = cube
+        return cube
+    
+    # polygon list of the snake, tail first
+    @property
+    def p_list(self):
+        if self._p_list is None:
+            self._p_list = list(self.cubes)
+        return self._p_list
+    
+    # position of the head
+    @property
+    def head_pos(self):
+        return vec.V4(list(self.cells[-1]))
+    
+    # keep the occupancy in sync with the segments
+    def add_cell(self, cell):
+        cube = self.cell_cube(cell)
+        self.cells.append(cell)
+        self.cubes.append(cube)
+        self.occupancy.add(cell)
+        self._p_list = None
+        
+        self.serials.append(self.next_serial)
+        self.added.append((self.next_serial, cube))
+        self.next_serial += 1
+    
+    def pop_cell(self):
+        cell = self.cells.popleft()
+        self.cubes.popleft()
+        self.occupancy.remove(cell)
+        self._p_list = None
+        
+        self.removed.append(self.serials.popleft())
+    
+    # returns and clears the segments added and removed so far
+    def pop_changes(self):
+        changes = (self.added, self.removed)
+        self.added = []
+        self.removed = []
+        return changes
+    
+    # the cell where the head is
+    def head_cell(self):
+        return self.cells[-1]
     
     def change_dir(self, new_dir):
         if new_dir != self.opposite_dir[self.head_dir]:
@@ -61,19 +132,18 @@ class Snake:
             return False
     
     def move(self):
-        # move the snake head
-        self.head_pos = self.head_pos + self.dir_v[self.head_dir]
+        # move the snake body by popping the tail cell and adding a
+        # cell in front of the head 
+        x, y, z, w = self.cells[-1]
+        dx, dy, dz, dw = self.dir_cell[self.head_dir]
         
-        # move the snake body by popping the last element and adding a
-        # segment in the head 
-        self.p_list.pop(0)
-        self.p_list.append(self.create_cube(self.head_pos))
+        self.pop_cell()
+        self.add_cell((x + dx, y + dy, z + dz, w + dw))
     
     def add_segment(self):
-        # copy the last block
-        last_block = copy.deepcopy(self.p_list[-1])
-        # add to polygon list
-        self.p_list.append(last_block)
+        # the new segment is on the head, the snake grows as the head moves
+        # away from it
+        self.add_cell(self.cells[-1])
 
 
 if __name__ ==  "__main__":
@@ -24,7 +24,15 @@ epsilon = 0.00000001
 # Helpers
 #==============================================================================
 
-
+# allocates a vector of the given class without going through the __init__
+# type checks, used by the operators of the fixed size vectors
+_new_vector = object.__new__
+
+def from_coords(cls, coords):
+    v = _new_vector(cls)
+    v.coords = coords
+    v.dimension = len(coords)
+    return v
         
 #==============================================================================
 # Errors
@@ -39,6 +47,10 @@ class VecExcept(Exception):
 
 class Vector:
     
+    # the vectors are created by the thousands every frame, the slots avoid
+    # the per instance dictionary
+    __slots__ = ("coords", "dimension")
+    
     def __init__(self, dimensions, coords = None):
         if isinstance(dimensions, str):
             self.read_file(dimensions)
@@ -106,45 +118,28 @@ class Vector:
     # operator + (elementwise sum)    
     def __add__(self, v2):
         self.check_dimensions(v2)        
-       
-        new_coords = [0 for i in range(self.dimension)]
-        
-        for i in range(self.dimension):
-            new_coords[i] = self.coords[i] + v2[i]
-        
-        return self.__class__(new_coords)   
+        b = v2.coords
+        return from_coords(self.__class__, [c + b[i] for i, c in enumerate(self.coords)])   
     
     # operator - (elementwise subtraction)
     def __sub__(self, v2):
         self.check_dimensions(v2)        
-        new_coords = [0 for i in range(self.dimension)]
-        for i in range(self.dimension):
-            new_coords[i] = self.coords[i] - v2[i]
-        return self.__class__(new_coords)   
+        b = v2.coords
+        return from_coords(self.__class__, [c - b[i] for i, c in enumerate(self.coords)])   
     
     # operator * (elementwise multiplication with a constant)
     def __mul__(self, k):
-        # if k is a vector do the dot product
-        new_coords = [0 for i in range(self.dimension)]
-        for i in range(self.dimension):
-            new_coords[i] = self.coords[i] * k
-        return self.__class__(new_coords)
+        return from_coords(self.__class__, [c * k for c in self.coords])
     
     # operator / (elementwise division)
     def __truediv__(self, d):
         if d == 0: raise VecExcept("Vector: Zero Division Error")
-        new_coords = [0 for i in range(self.dimension)]
-        for i in range(self.dimension):
-            new_coords[i] = self.coords[i] / d
-        return self.__class__(new_coords)        
+        return from_coords(self.__class__, [c / d for c in self.coords])        
     
     # operator == (check exactly if the vectors are the same)
     def __eq__(self, v2):
         self.check_dimensions(v2)
-        for i in range(self.dimension):
-            if self.coords[i] != v2[i]:
-                return False
-        return True
+        return self.coords == v2.coords
 
     # if the vector are close enough they are considered the same
     def is_close(self, v2):
@@ -165,15 +160,11 @@ class Vector:
     
     def as_bytes(self, bf):
         bf.write("I", self.dimension)
-        for c in self.coords:
-            bf.write("d", c)
+        bf.write_array("d", self.coords)
     
     def interpret_bytes(self, bf):
         self.dimension = bf.read('I')
-        
-        self.coords = [0 for i in range(self.dimension)]
-        for i in range(self.dimension):
-            self.coords[i] = bf.read('d')   
+        self.coords = bf.read_array('d', self.dimension)
 
     def write_file(self, filename):
         with open(filename, "wb") as f:
@@ -185,17 +176,25 @@ class Vector:
         with open(filename, "rb") as f:
             bf = bfh.BinaryFile(f)
             self.interpret_bytes(bf)
+
 #==============================================================================
 # 2d vector
+#   the fixed size vectors override the operators with unrolled versions,
+#   the dimension check is a single comparison and only one list is created
 #==============================================================================
 
 class V2(Vector):
     
+    __slots__ = ()
+    
     def __init__(self, x, y = None):
-
-        if y is None and type(x) is list:
-            super().__init__(2, x)
-        elif y is None and type(x) is str:
+        if y is not None:
+            self.coords = [x, y]
+            self.dimension = 2
+        elif type(x) is list:
+            self.coords = x
+            self.dimension = 2
+        elif type(x) is str:
             super().__init__(x)
         else:
             super().__init__(2)
@@ -208,17 +207,51 @@ class V2(Vector):
     def y(self, c = False):
         return self.get_set_coord(1, c)
 
+    def dot(self, v2):
+        if v2.dimension != 2: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return a[0] * b[0] + a[1] * b[1]
+    
+    def __add__(self, v2):
+        if v2.dimension != 2: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return from_coords(self.__class__, [a[0] + b[0], a[1] + b[1]])
+
+    def __sub__(self, v2):
+        if v2.dimension != 2: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return from_coords(self.__class__, [a[0] - b[0], a[1] - b[1]])
+    
+    def __mul__(self, k):
+        a = self.coords
+        return from_coords(self.__class__, [a[0] * k, a[1] * k])
+
+    def is_close(self, v2):
+        if v2.dimension != 2: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return (abs(a[0] - b[0]) <= epsilon and 
+                abs(a[1] - b[1]) <= epsilon)
+
 #==============================================================================
 # 3d vector
 #==============================================================================
 
 class V3(Vector):
     
+    __slots__ = ()
+    
     def __init__(self, x, y = None, z = None):
-
-        if y is None and z is None and type(x) is list:
-            super().__init__(3, x)      
-        elif y is None and type(x) is str:
+        if y is not None:
+            self.coords = [x, y, z]
+            self.dimension = 3
+        elif z is None and type(x) is list:
+            self.coords = x
+            self.dimension = 3
+        elif type(x) is str:
             super().__init__(x)
         else:
             super().__init__(3)
@@ -234,13 +267,45 @@ class V3(Vector):
 
     def z(self, c = False):
         return self.get_set_coord(2, c)  
+
+    def dot(self, v2):
+        if v2.dimension != 3: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+    
+    def __add__(self, v2):
+        if v2.dimension != 3: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return from_coords(self.__class__, [a[0] + b[0], a[1] + b[1], a[2] + b[2]])
+
+    def __sub__(self, v2):
+        if v2.dimension != 3: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return from_coords(self.__class__, [a[0] - b[0], a[1] - b[1], a[2] - b[2]])
+    
+    def __mul__(self, k):
+        a = self.coords
+        return from_coords(self.__class__, [a[0] * k, a[1] * k, a[2] * k])
+
+    def is_close(self, v2):
+        if v2.dimension != 3: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return (abs(a[0] - b[0]) <= epsilon and 
+                abs(a[1] - b[1]) <= epsilon and
+                abs(a[2] - b[2]) <= epsilon)
     
     # cross product between 2 vectors
     def cross(self, v2):
-        x = self[1] * v2[2] - self[2] * v2[1]
-        y = self[2] * v2[0] - self[0] * v2[2]
-        z = self[0] * v2[1] - self[1] * v2[0]
-        return V3(x,y,z)
+        a = self.coords
+        b = v2.coords
+        x = a[1] * b[2] - a[2] * b[1]
+        y = a[2] * b[0] - a[0] * b[2]
+        z = a[0] * b[1] - a[1] * b[0]
+        return from_coords(V3, [x, y, z])
 
 #==============================================================================
 # 4d vector    
@@ -248,10 +313,16 @@ class V3(Vector):
 
 class V4(Vector):
     
+    __slots__ = ()
+    
     def __init__(self, x, y = None, z = None, w = None):
-        if type(x) is list and y is None and z is None and w is None:
-            super().__init__(4, x)         
-        elif y is None and type(x) is str:
+        if y is not None:
+            self.coords = [x, y, z, w]
+            self.dimension = 4
+        elif type(x) is list and z is None and w is None:
+            self.coords = x
+            self.dimension = 4
+        elif type(x) is str:
             super().__init__(x)
         else:
             super().__init__(4)
@@ -272,6 +343,40 @@ class V4(Vector):
     def w(self, c = False):
         return self.get_set_coord(3, c) 
 
+    def dot(self, v2):
+        if v2.dimension != 4: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return a[0] * b[0] + a[1] * b[1] + a[2] * b[2] + a[3] * b[3]
+    
+    def __add__(self, v2):
+        if v2.dimension != 4: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return from_coords(self.__class__, [a[0] + b[0], a[1] + b[1], 
+                                            a[2] + b[2], a[3] + b[3]])
+
+    def __sub__(self, v2):
+        if v2.dimension != 4: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return from_coords(self.__class__, [a[0] - b[0], a[1] - b[1], 
+                                            a[2] - b[2], a[3] - b[3]])
+    
+    def __mul__(self, k):
+        a = self.coords
+        return from_coords(self.__class__, [a[0] * k, a[1] * k, 
+                                            a[2] * k, a[3] * k])
+
+    def is_close(self, v2):
+        if v2.dimension != 4: raise VecExcept("Vector: wrong dimensions")
+        a = self.coords
+        b = v2.coords
+        return (abs(a[0] - b[0]) <= epsilon and 
+                abs(a[1] - b[1]) <= epsilon and
+                abs(a[2] - b[2]) <= epsilon and
+                abs(a[3] - b[3]) <= epsilon)
+
     def cross(self, v, w):
         A = (v[0] * w[1])-(v[1] * w[0])
         B = (v[0] * w[2])-(v[2] * w[0])
@@ -9,10 +9,10 @@ Created on Wed May 23 15:33:29 2018
 # Drawing classes
 #==============================================================================
 
-from tkinter import Frame, Canvas, Label
 import vec, prj, poly, qua, rot4
-import copy
 import math
+import instrument
+import raster
 
 # The drawing functions are the ones taking more time
 # One way to reduce the drawing burden is to reduce the drawed objects
@@ -26,9 +26,19 @@ import math
 # optimization 2
 # draw only new stuff, construct a drawn primitives buffer that checks if the
 # edge was already drawn. The edges are queried and if they are present in the
-# buffer, they get a check in flag
-# if they are not present, they dont have the check in flag so they can be
-# easly deleted
+# buffer, they get checked in for the current frame
+# if they are not checked in the current frame they can be easly deleted
+
+# optimization 3
+# retained mode, when the camera rotates every projected coordinate changes
+# and the whole scene would be deleted and recreated. The retained renderer
+# keeps one canvas item per (polygon, edge) and moves it with canvas.coords,
+# the items not needed anymore are hidden and reused later
+
+# optimization 4
+# raster backend, the edges are drawn in a pixel buffer that is pushed to a
+# single PhotoImage per area, the canvas has one image item whatever the
+# scene is. The same drawing works without tk to render headless frames
 
 #==============================================================================
 # Class Edge
@@ -55,43 +65,398 @@ class Edge:
         self.v1_item_n = None
         self.v2_item_n = None
         
-        # if true, means someone wants to draw the vector.
-        # if False, nobody wants the vector so it can be safely removed
-        self.checked_in = False
+        # the frame (generation) in which someone wanted to draw the edge,
+        # if is an old generation nobody wants the edge so it can be safely 
+        # removed
+        self.checked_in = -1
 
 #==============================================================================
 # class Drawn Edges
 #   little utilites to control the edge alredy drawn on the screen
+#   the edges are indexed by the coordinates of the end points snapped to a
+#   small grid, so that finding an edge is a dictionary look up
 #==============================================================================
 
+# size of the grid used to snap the 2d coordinates, points closer than this
+# are considered the same
+snap = 1e-6
+
+def edge_key(v1, v2):
+    ''' the key is independent of the edge orientation '''
+    k1 = (round(v1[0] / snap), round(v1[1] / snap))
+    k2 = (round(v2[0] / snap), round(v2[1] / snap))
+    return (k1, k2) if k1 <= k2 else (k2, k1)
+
 class DrawnEdges:
     
     def __init__(self):
-        self.drawn = []
+        # edge key -> Edge
+        self.drawn = {}
+        
+        # edges added that don't have a canvas item yet
+        self.new_edges = []
+        
+        # current check in generation
+        self.generation = 0
 
-    # add one edge to the list
+    # add one edge to the list, if there is one already in the list, then 
+    # mark it as already drawn
     def add_edge(self, v1, v2, inpe, color):
-        edge_present = False
-        
-        for i, e in enumerate(self.drawn):
-            # find the closest possible edge to the one inputed
-            # if tehre is one already in the list, then mark it 
-            # as already drawn
-            if e.v1.is_close(v1) and e.v2.is_close(v2):
-                edge_present = True
-                edge_i = i
-                break
-        
-        # if the edge is already present check it in
-        if edge_present:
-            self.drawn[edge_i].checked_in = True
+        key = edge_key(v1, v2)
+        edge = self.drawn.get(key)
+        
         # if the edge is not present, pipe it to draw it
-        else:
-            self.drawn.append(Edge(v1, v2, inpe, color))
+        if edge is None:
+            edge = Edge(v1, v2, inpe, color)
+            self.drawn[key] = edge
+            self.new_edges.append(edge)
+        
+        # check it in
+        edge.checked_in = self.generation
+        return edge
+    
+    def pop_new_edges(self):
+        new_edges = self.new_edges
+        self.new_edges = []
+        return new_edges
+    
+    def sweep(self):
+        ''' removes and returns the edges not checked in since the last 
+        sweep, then starts a new generation '''
+        stale = [key for key, e in self.drawn.items() 
+                 if e.checked_in != self.generation]
+        
+        removed = [self.drawn.pop(key) for key in stale]
+        
+        self.reset_check_in()
+        return removed
     
     def reset_check_in(self):
-        for i in range(len(self.drawn)):
-            self.drawn[i].checked_in = False
+        self.generation += 1
+
+#==============================================================================
+# Canvas transform
+#   the conversion from the area units to the canvas pixels as in
+#   VisuArea.convert_to_canvas_coord: px = kx x + ox, py = oy - ky y
+#==============================================================================
+
+def canvas_transform(area):
+    return (area.cw / area.area_w, area.ch / area.area_h, 
+            area.c_center_w, area.ch - area.c_center_h)
+
+#==============================================================================
+# class Item pool
+#   keeps a canvas item for each key, the items are moved and recolored
+#   only if needed, the ones not placed in a frame are hidden and put in a
+#   free list to be reused by the next new key
+#==============================================================================
+
+class CanvasItem:
+    
+    __slots__ = ("item_n", "coords", "color")
+    
+    def __init__(self, item_n, coords, color):
+        self.item_n = item_n
+        self.coords = coords
+        self.color = color
+
+class ItemPool:
+    
+    def __init__(self, canvas, create):
+        self.canvas = canvas
+        
+        # canvas function that creates a new item of the pool kind
+        self.create = create
+        
+        # items placed in the last frame and in the current one
+        self.items = {}
+        self.used = {}
+        
+        # hidden items ready to be reused
+        self.free = []
+        
+        # tk calls done, for statistics
+        self.calls = 0
+    
+    def place(self, key, coords, color):
+        if key in self.used:
+            return
+        
+        item = self.items.pop(key, None)
+        
+        if item is not None:
+            # the item is on the canvas already, update only what changed
+            if item.coords != coords:
+                self.canvas.coords(item.item_n, *coords)
+                item.coords = coords
+                self.calls += 1
+            
+            if item.color != color:
+                self.canvas.itemconfig(item.item_n, fill=color)
+                item.color = color
+                self.calls += 1
+        
+        elif self.free:
+            # reuse an hidden item
+            item = self.free.pop()
+            
+            if item.coords != coords:
+                self.canvas.coords(item.item_n, *coords)
+                item.coords = coords
+                self.calls += 1
+            
+            self.canvas.itemconfig(item.item_n, fill=color, state="normal")
+            item.color = color
+            self.calls += 1
+        
+        else:
+            item = CanvasItem(self.create(*coords, fill=color), coords, color)
+            self.calls += 1
+        
+        self.used[key] = item
+    
+    def end_frame(self):
+        ''' hides the items that were not placed in this frame '''
+        for item in self.items.values():
+            self.canvas.itemconfig(item.item_n, state="hidden")
+            self.free.append(item)
+            self.calls += 1
+        
+        self.items = self.used
+        self.used = {}
+    
+    def __len__(self):
+        return len(self.items) + len(self.free)
+
+#==============================================================================
+# class Retained renderer
+#   draws a list of 2d polygons using an item pool for the edges and one for
+#   the vertexes, the items are keyed by (polygon id, edge id) and 
+#   (polygon id, vertex id). The polygon ids are the stable ids given by the
+#   game engine, or the position in the list if there are none. With stable
+#   ids a still camera moves only the items of the new and removed segments
+#==============================================================================
+
+class RetainedRenderer:
+    
+    def __init__(self, area):
+        self.area = area
+        
+        canvas = area.canvas
+        self.lines = ItemPool(canvas, canvas.create_line)
+        self.points = ItemPool(canvas, canvas.create_rectangle)
+        
+        # half size of the vertex square in pixels
+        self.half_point = 3.5 / 2
+    
+    def draw(self, p2_list, draw_vert = True, pid_list = None):
+        area = self.area
+        
+        kx, ky, ox, oy = canvas_transform(area)
+        hp = self.half_point
+        
+        lines = self.lines
+        points = self.points
+        
+        # overlapping edges of different polygons are drawn once
+        seen = set()
+        
+        if pid_list is None:
+            pid_list = range(len(p2_list))
+        
+        for pid, p2 in zip(pid_list, p2_list):
+            color = p2.color
+            
+            canvas_v = []
+            for v in p2.v_list:
+                c = v.coords
+                canvas_v.append((kx * c[0] + ox, oy - ky * c[1]))
+            
+            for eid, e in enumerate(p2.e_list):
+                v1 = canvas_v[e[0]]
+                v2 = canvas_v[e[1]]
+                
+                key = edge_key(v1, v2)
+                if key in seen:
+                    continue
+                seen.add(key)
+                
+                lines.place((pid, eid), v1 + v2, color)
+                
+                if draw_vert:
+                    for vid in e:
+                        x, y = canvas_v[vid]
+                        points.place((pid, vid), 
+                                     (x - hp, y - hp, x + hp, y + hp), color)
+        
+        lines.end_frame()
+        points.end_frame()
+    
+    def calls(self):
+        ''' number of tk calls done so far '''
+        return self.lines.calls + self.points.calls
+
+#==============================================================================
+# class Level of detail
+#   simplifies the projected snake segments when the snake is long, the
+#   segments far from the head or small on the screen are drawn as their
+#   screen outline (4 edges) or as a centroid marker (a small cross of 2
+#   edges). If the frame still has more edges than the budget, the shortest
+#   edges on the screen are dropped. The polygons before first_segment (bbox
+#   and food) are always drawn in full.
+#   The segments that will be markers anyway are reduced to their centroid
+#   before the projection, so that only one vertex is projected for them
+#==============================================================================
+
+class LevelOfDetail:
+    
+    level_full = 0
+    level_outline = 1
+    level_marker = 2
+    
+    def __init__(self, min_length = 32, outline_rank = 16, marker_rank = 48,
+                 outline_size = 0.2, marker_size = 0.08, edge_budget = 600,
+                 first_segment = 2):
+        # the policy is used only for snakes longer than this
+        self.min_length = min_length
+        
+        # segments distance from the head (in segments) where the detail
+        # drops to outline or to marker
+        self.outline_rank = outline_rank
+        self.marker_rank = marker_rank
+        
+        # screen size (area units) under which the detail drops
+        self.outline_size = outline_size
+        self.marker_size = marker_size
+        
+        # maximum number of edges drawn in a frame
+        self.edge_budget = edge_budget
+        
+        # index of the first snake segment in the list, the head is the last
+        self.first_segment = first_segment
+        
+        # statistics of the last frame
+        self.last_stats = {}
+    
+    def reduce(self, p_list):
+        ''' replaces the 4d segments far from the head with their centroid '''
+        first = self.first_segment
+        n = len(p_list)
+        if n - first <= self.min_length or n - first <= self.marker_rank:
+            return p_list
+        
+        res = p_list[:first]
+        last_far = n - 1 - self.marker_rank
+        for idx in range(first, n):
+            p = p_list[idx]
+            if idx <= last_far:
+                c = p.coords()
+                k = len(c) // 4
+                point = poly.Polygon()
+                point.color = p.color
+                point.v_list = [vec.V4([sum(c[i::4]) / k for i in range(4)])]
+                p = point
+            res.append(p)
+        return res
+    
+    def screen_box(self, p2):
+        c = p2.coords()
+        xs = c[0::2]
+        ys = c[1::2]
+        return min(xs), min(ys), max(xs), max(ys)
+    
+    def level(self, rank, size):
+        if rank >= self.marker_rank or size < self.marker_size:
+            return self.level_marker
+        if rank >= self.outline_rank or size < self.outline_size:
+            return self.level_outline
+        return self.level_full
+    
+    def outline(self, p2, box):
+        x0, y0, x1, y1 = box
+        p = poly.Polygon()
+        p.color = p2.color
+        p.v_list = [vec.V2(x0, y0), vec.V2(x1, y0), vec.V2(x1, y1), 
+                    vec.V2(x0, y1)]
+        p.e_list = [(0, 1), (1, 2), (2, 3), (3, 0)]
+        return p
+    
+    def marker(self, p2, box):
+        x0, y0, x1, y1 = box
+        cx = (x0 + x1) / 2
+        cy = (y0 + y1) / 2
+        h = self.marker_size / 2
+        p = poly.Polygon()
+        p.color = p2.color
+        p.v_list = [vec.V2(cx - h, cy), vec.V2(cx + h, cy), 
+                    vec.V2(cx, cy - h), vec.V2(cx, cy + h)]
+        p.e_list = [(0, 1), (2, 3)]
+        return p
+    
+    def drop_short_edges(self, p2_list, n_edges):
+        ''' keeps only the longest edges of the segments so that the frame 
+        fits in the budget '''
+        pinned = sum(len(p.e_list) for p in p2_list[:self.first_segment])
+        keep = max(0, self.edge_budget - pinned)
+        
+        lengths = []
+        for i, p in enumerate(p2_list[self.first_segment:]):
+            c = p.coords()
+            for j, e in enumerate(p.e_list):
+                dx = c[2 * e[0]] - c[2 * e[1]]
+                dy = c[2 * e[0] + 1] - c[2 * e[1] + 1]
+                lengths.append((dx * dx + dy * dy, i, j))
+        
+        lengths.sort(reverse=True)
+        kept = set((i, j) for l, i, j in lengths[:keep])
+        
+        res = p2_list[:self.first_segment]
+        for i, p in enumerate(p2_list[self.first_segment:]):
+            q = poly.Polygon()
+            q.color = p.color
+            q.v_list = p.v_list
+            q.e_list = [e for j, e in enumerate(p.e_list) if (i, j) in kept]
+            res.append(q)
+        
+        return res, len(lengths) - len(kept)
+    
+    def apply(self, p2_list):
+        ''' returns the list of the polygons to draw '''
+        first = self.first_segment
+        n_segments = len(p2_list) - first
+        
+        counts = [0, 0, 0]
+        dropped = 0
+        
+        if n_segments > self.min_length:
+            res = p2_list[:first]
+            for idx in range(first, len(p2_list)):
+                p2 = p2_list[idx]
+                rank = len(p2_list) - 1 - idx
+                box = self.screen_box(p2)
+                size = max(box[2] - box[0], box[3] - box[1])
+                
+                level = self.level(rank, size)
+                counts[level] += 1
+                
+                if level == self.level_full:
+                    res.append(p2)
+                elif level == self.level_outline:
+                    res.append(self.outline(p2, box))
+                else:
+                    res.append(self.marker(p2, box))
+        else:
+            res = p2_list
+            counts[self.level_full] = max(0, n_segments)
+        
+        n_edges = sum(len(p.e_list) for p in res)
+        if n_edges > self.edge_budget:
+            res, dropped = self.drop_short_edges(res, n_edges)
+        
+        self.last_stats = {"full" : counts[0], "outline" : counts[1],
+                           "marker" : counts[2], "dropped_edges" : dropped,
+                           "edges" : n_edges - dropped}
+        return res
 
 #==============================================================================
 # class Area visualization
@@ -100,7 +465,12 @@ class DrawnEdges:
 
 class VisuArea:
     
-    def __init__(self, parent_frame, project_method, area_size, title = ""):
+    def __init__(self, parent_frame, project_method, area_size, title = "",
+                 retained = False, lod = None, backend = "canvas"):
+        
+        # tk is imported only by the areas on screen, the projections and
+        # the headless area work without a display
+        from tkinter import Frame, Canvas, Label, PhotoImage
         
         # parent frame
         self.fP = Frame(parent_frame)
@@ -133,6 +503,23 @@ class VisuArea:
         # the already drawn edges class
         self.drawn_edges = DrawnEdges()
         
+        # the retained renderer moves the canvas items instead of recreating
+        # them, used by draw_plist if requested
+        self.retained = RetainedRenderer(self) if retained else None
+        
+        # level of detail policy applied to the projected polygons, if any
+        self.lod = lod
+        
+        # the raster backend draws in a pixel buffer shown by one image item
+        self.raster = None
+        if backend == "raster":
+            self.raster = raster.Raster(self.cw, self.ch)
+            self.photo = PhotoImage(master=self.canvas, width=self.cw, 
+                                    height=self.ch)
+            self.canvas.create_image(0, 0, anchor="nw", image=self.photo)
+        elif backend != "canvas":
+            raise ValueError("VisuArea: unknown backend " + str(backend))
+        
         # text drawn on the canvas
         self.text_items = []
     
@@ -178,53 +565,92 @@ class VisuArea:
             v2 = poly2.v_list[ e[1] ]
             self.drawn_edges.add_edge(v1, v2, e, poly2.color)
             
-        # this should draw only the edges that are selected
-        for i, edge in enumerate(self.drawn_edges.drawn):
-            if edge.item_n == None:
-                # draws the edge
-                inum = self.draw_edge(edge.v1, edge.v2, kwargs={"fill" : edge.c}) 
-                self.drawn_edges.drawn[i].item_n = inum
-                
-                # draws vertexes
-                if draw_vert:
-                    inum = self.draw_point(poly2.v_list[edge.e[0]], 3.5, kwargs={"fill" : edge.c})
-                    self.drawn_edges.drawn[i].v1_item_n = inum
-    
-                    inum = self.draw_point(poly2.v_list[edge.e[1]], 3.5, kwargs={"fill" : edge.c})
-                    self.drawn_edges.drawn[i].v2_item_n = inum   
-                
-                # check-in that the primitive has been drawn
-                self.drawn_edges.drawn[i].checked_in = True
+        # this should draw only the edges that are new
+        for edge in self.drawn_edges.pop_new_edges():
+            # draws the edge
+            edge.item_n = self.draw_edge(edge.v1, edge.v2, kwargs={"fill" : edge.c}) 
+            
+            # draws vertexes
+            if draw_vert:
+                edge.v1_item_n = self.draw_point(edge.v1, 3.5, kwargs={"fill" : edge.c})
+                edge.v2_item_n = self.draw_point(edge.v2, 3.5, kwargs={"fill" : edge.c})
     
     # removes edges and vertexes not needed anymore
+    @instrument.timed("VisuArea.clear_area")
     def clear_area(self):
-        # create a new list
-        tmp_drawn = []
-        
-        # add the edges to keep and remove the one that are not needed anymore
-        for e in self.drawn_edges.drawn:
-            if e.checked_in == False:
-                self.canvas.delete(e.item_n)
-                if e.v1_item_n:
-                    self.canvas.delete(e.v1_item_n)
-                    self.canvas.delete(e.v2_item_n)
-            else:
-                tmp_drawn.append(e)
-        
-        # the new filtered list becomes the the list
-        self.drawn_edges.drawn = tmp_drawn
-        self.drawn_edges.reset_check_in()
+        for e in self.drawn_edges.sweep():
+            self.canvas.delete(e.item_n)
+            if e.v1_item_n:
+                self.canvas.delete(e.v1_item_n)
+                self.canvas.delete(e.v2_item_n)
     
     # transform a 4d polygon to a 2d one
     def project4(self, poly):
         p2 = self.project_method.project(poly)
         return p2
     
-    # draw all the polygons in a list
-    def draw_plist(self, p_list):
-        for p in p_list:
-            p2 = self.project4(p)
-            self.draw_poly(p2, True)
+    # draw all the polygons in a list, the projection is done in one batch
+    # the retained renderer hides by itself the items not used anymore, so
+    # clear_area has nothing to sweep in that case
+    @instrument.timed("VisuArea.draw_plist")
+    def draw_plist(self, p_list, pid_list = None):
+        if self.lod:
+            p_list = self.lod.reduce(p_list)
+        
+        p2_list = self.project_method.project_plist(p_list)
+        
+        if self.lod:
+            p2_list = self.lod.apply(p2_list)
+        
+        if self.raster:
+            self.raster.clear()
+            self.raster.draw_polygons(p2_list, canvas_transform(self))
+            self.photo.configure(data=self.raster.ppm(), format="PPM")
+        elif self.retained:
+            self.retained.draw(p2_list, True, pid_list)
+        else:
+            for p2 in p2_list:
+                self.draw_poly(p2, True)
+
+#==============================================================================
+# class Headless area
+#   same geometry and projection of the VisuArea but without tk, the frames
+#   are drawn with the raster backend and can be saved as PPM or PNG
+#==============================================================================
+
+class HeadlessArea:
+    
+    def __init__(self, project_method, area_size, lod = None):
+        self.cw = area_size[0]
+        self.ch = area_size[1]
+        
+        self.area_w = 5
+        self.area_h = 5
+        
+        self.c_center_w = self.cw / 2
+        self.c_center_h = self.ch / 2
+        
+        self.project_method = project_method
+        self.lod = lod
+        
+        self.raster = raster.Raster(self.cw, self.ch)
+    
+    def render(self, p_list):
+        ''' draws the polygons, returns the raster '''
+        if self.lod:
+            p_list = self.lod.reduce(p_list)
+        
+        p2_list = self.project_method.project_plist(p_list)
+        
+        if self.lod:
+            p2_list = self.lod.apply(p2_list)
+        
+        self.raster.clear()
+        self.raster.draw_polygons(p2_list, canvas_transform(self))
+        return self.raster
+    
+    def save(self, p_list, filename):
+        self.render(p_list).save(filename)
 
 #==============================================================================
 # Perspective projection    
@@ -241,6 +667,9 @@ class ProjectCam:
         self.cam4 = prj.Cam4()
         self.cam4.change_position(vec.V4(15, 0.1, 0.1, 0.1))
         
+        # keeps the 4d camera orientation
+        self.orbit4 = rot4.Orbit4(self.cam4)
+        
         # construct the index to axis mapping for the 3d-rotations
         self.idx_to_axis = {}
         for i in range(3):
@@ -249,16 +678,47 @@ class ProjectCam:
             self.idx_to_axis[i] = vec.V3(axis)
     
     # projects 4d to 2d
+    @instrument.timed("ProjectCam.project")
     def project(self, poly4):
-        # copy values like edges and colors
-        polygon = copy.deepcopy(poly4)
-        
-        # calculate new vertexes
-        for i in range(len(polygon.v_list)):
-            p3 = self.cam4.prj(polygon.v_list[i])      
-            p2 = self.cam3.prj(p3)
-            polygon.v_list[i] = p2
-        return polygon
+        return self.project_plist([poly4])[0]
+    
+    # projects all the polygons of a list in one pass
+    @instrument.timed("ProjectCam.project_plist")
+    def project_plist(self, p_list):
+        # stack the vertexes of all the polygons in a flat coordinate array
+        # the hypercubes give the coordinates without building the vectors
+        coords4 = []
+        n_list = []
+        for p in p_list:
+            c = p.coords()
+            coords4.extend(c)
+            n_list.append(len(c) // 4)
+        
+        coords2 = self.project_coords(coords4)
+        
+        # split the projected coordinates back to the polygons, the edges,
+        # faces and color are shared with the 4d polygon instead of copied
+        p2_list = []
+        k = 0
+        for p, n in zip(p_list, n_list):
+            p2 = poly.Polygon()
+            p2.color = p.color
+            p2.e_list = p.e_list
+            p2.f_list = p.f_list
+            
+            v_list = p2.v_list
+            for i in range(n):
+                v_list.append(vec.V2(coords2[k], coords2[k + 1]))
+                k += 2
+            
+            p2_list.append(p2)
+        return p2_list
+    
+    # projects a flat list of 4d coordinates (x0, y0, z0, w0, x1, ...) to a
+    # flat list of 2d coordinates, the cameras keep their constants cached
+    # between the frames
+    def project_coords(self, coords4):
+        return self.cam3.prj_many(self.cam4.prj_many(coords4))
     
     # rotate the camera in the 3-space
     def rotate3(self, angles):
@@ -271,40 +731,18 @@ class ProjectCam:
                 v = qua.rot_around_axis(self.cam3.From, axis, angle)
                 self.cam3.change_position(v)
     
-    # rotate camera in the 4-space
+    # rotate camera in the 4-space, the camera orbits around the target
     def rotate4(self, angles):
-
-        if angles[0] != 0:
-            angle = math.radians(angles[0])
-            rotv = rot4.rot_alpha(self.cam4.From, angle)
-
-        if angles[1] != 0:
-            angle = math.radians(angles[1])
-            rotv = rot4.rot_beta(self.cam4.From, angle)
-        
-        if angles[2] != 0:
-            angle = math.radians(angles[2])
-            rotv = rot4.rot_gamma(self.cam4.From, angle)
-        
-        if angles[3] != 0:
-            angle = math.radians(angles[3])
-            rotv = rot4.rot_delta(self.cam4.From, angle)
-        
-        if angles[4] != 0:
-            angle = math.radians(angles[4])
-            rotv = rot4.rot_rho(self.cam4.From, angle)
-        
-        if angles[5] != 0:
-            angle = math.radians(angles[5])
-            rotv = rot4.rot_epsilon(self.cam4.From, angle)
-
-        self.cam4.change_position(rotv)
+        self.orbit4.rotate(*[math.radians(a) for a in angles])
 
 
 #==============================================================================
 # Flat projection
 #==============================================================================
 
+# inverse of the lattice step used to find overlapping flat edges
+lattice = 1e6
+
 class ProjectFlat:
     
     def __init__(self, axes):
@@ -326,47 +764,54 @@ class ProjectFlat:
     
     # flatten the points according to the above description    
     def project(self, poly4): 
-        # copy the polygon
-        poly2 = poly.Polygon()
-        poly2.color = poly4.color
-        
-        # extract the 2d information
-        for v in poly4.v_list:
-            # is specular inverted to match the the keyboard directions
-            x = v[self.i] * self.zoom * -1 
-            y = v[self.j] * self.zoom 
-            poly2.v_list.append(vec.V2(x, y))
-        
-        # index / vertex class
-        class EIndex:
-            def __init__(self, v1, v2, e):
-                self.v1 = v1
-                self.v2 = v2
-                self.e = e
-                
-        preserved = []
-        
-        # gather the edges of the 4d polygon
-        for e in poly4.e_list:
-            # gather the vertexes of the projected polygon
-            v1 = poly2.v_list[e[0]]
-            v2 = poly2.v_list[e[1]]
+        return self.project_plist([poly4])[0]
+    
+    # flattens all the polygons of the list in one pass
+    # the overlapping edges are filtered with a set of keys made with the
+    # two kept coordinates snapped on a fine lattice, the polygons vertexes
+    # are on the half unit grid so the snapping is exact.
+    # Edges that collapse to a point are dropped too, this reduces the number
+    # of edges to draw by 4 on average
+    @instrument.timed("ProjectFlat.project_plist")
+    def project_plist(self, p_list):
+        i = self.i
+        j = self.j
+        
+        # is specular inverted to match the the keyboard directions
+        zx = self.zoom * -1
+        zy = self.zoom
+        
+        p2_list = []
+        
+        for poly4 in p_list:
+            poly2 = poly.Polygon()
+            poly2.color = poly4.color
             
-            ei = EIndex(v1, v2, e)
+            # extract the 2d information and the lattice keys
+            v_list = poly2.v_list
+            keys = []
+            c = poly4.coords()
+            for k in range(0, len(c), 4):
+                ci = c[k + i]
+                cj = c[k + j]
+                v_list.append(vec.V2(ci * zx, cj * zy))
+                keys.append((round(ci * lattice), round(cj * lattice)))
             
-            # scan the edge vertexes to find overlapping edges
-            # based on difference norm
-            unique = True
-            for pei in preserved:
-                if ei.v1.is_close(pei.v1) and ei.v2.is_close(pei.v2):
-                    unique = False
-                    break
+            seen = set()
+            e_list = []
+            for e in poly4.e_list:
+                k1 = keys[e[0]]
+                k2 = keys[e[1]]
+                
+                if k1 == k2:
+                    continue
+                
+                key = (k1, k2) if k1 < k2 else (k2, k1)
+                if key not in seen:
+                    seen.add(key)
+                    e_list.append(e)
             
-            if unique:
-                preserved.append(ei) 
+            poly2.e_list = e_list
+            p2_list.append(poly2)
         
-        # construct the edge list based on the is close filtering above
-        # this reduces the number of edges to draw by 4 on average
-        poly2.e_list = [ei.e for ei in preserved]
-            
-        return poly2    
\ No newline at end of file
+        return p2_list